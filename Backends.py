@@ -0,0 +1,28 @@
+import importlib
+
+# backend name -> (module, class); imported on demand so that neither
+# gurobipy nor ortools is needed unless its backend is used
+BACKENDS = {
+    "gurobi": ("Solver", "Solver"),
+    "cpsat": ("CPSolver", "CPSolver"),
+}
+
+
+def make_solver(backend="gurobi", **options):
+    """Create the solver of ``backend`` with ``options``.
+
+    Every backend offers ``solve(testcase)``, ``report()``,
+    ``to_solution(testcase, sparse=False)``, ``draw_solution(solution)`` and
+    the ``status``, ``objective`` and ``gap`` of the last solve, so results
+    can be compared instance by instance. Options that only apply to the
+    Gurobi model, such as ``mode``, are dropped for the others.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown backend {backend!r}, expected one of {tuple(BACKENDS)}"
+        )
+    module, name = BACKENDS[backend]
+    if backend != "gurobi":
+        for option in ("mode", "builder", "symmetry", "connectivity"):
+            options.pop(option, None)
+    return getattr(importlib.import_module(module), name)(**options)
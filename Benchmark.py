@@ -0,0 +1,279 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import gurobipy as gp
+import numpy as np
+
+from FCFS import FCFS
+from Solver import Solver
+from Testcase import Testcase
+
+# Instance sizes swept per generator. dapu, hantiange and sanma have a fixed
+# floor plan, so only groups and horizon (through max_wait) vary for them.
+SUITE = {
+    "generate_data": [
+        dict(
+            number_people=8,
+            num_groups=G,
+            num_tables=D,
+            max_seats=4,
+            max_duration=6,
+            max_wait=W,
+            max_tables=3,
+        )
+        for G, D, W in [(10, 6, 12), (20, 6, 12), (20, 12, 12), (20, 12, 24)]
+    ],
+    "dapu": [dict(number_people=4, num_groups=G) for G in (8, 16, 32)],
+    "hantiange": [
+        dict(number_people=4, num_groups=G, max_duration=6, max_wait=W)
+        for G, W in [(12, 36), (24, 36), (24, 72)]
+    ],
+    "sanma": [
+        dict(number_people=6, num_groups=G, max_duration=5, max_wait=W)
+        for G, W in [(10, 30), (20, 30), (20, 60)]
+    ],
+}
+
+# Fields compared by ``compare``: larger is worse for all of them
+TIMED = ("build_time", "solve_time", "peak_rss_mb")
+
+
+def random_testcase(num_groups, num_tables, max_wait, seed=0):
+    return Testcase.generate_data(
+        number_people=8,
+        num_groups=num_groups,
+        num_tables=num_tables,
+        max_seats=4,
+        max_duration=6,
+        max_wait=max_wait,
+        max_tables=3,
+        seed=seed,
+    )
+
+
+def benchmark_builders(sizes, modes=Solver.MODES, repeat=3):
+    """Time ``Solver.build`` with both builders for every (G, D, wait) size.
+
+    Only model construction is timed, so sizes beyond the solver license
+    can still be measured.
+    """
+    rows = []
+    for num_groups, num_tables, max_wait in sizes:
+        testcase = random_testcase(num_groups, num_tables, max_wait)
+        for mode in modes:
+            row = {"G": num_groups, "D": num_tables, "mode": mode}
+            for builder in Solver.BUILDERS:
+                best = float("inf")
+                for _ in range(repeat):
+                    solver = Solver(mode=mode, builder=builder)
+                    start = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        solver.build(testcase)
+                    best = min(best, time.perf_counter() - start)
+                row["model_T"] = solver.horizon
+                row["vars"] = solver.model.NumVars
+                row["constrs"] = solver.model.NumConstrs
+                row[builder] = best
+                solver.model.dispose()
+            rows.append(row)
+            print(
+                f"G={row['G']:3d} D={row['D']:3d} T={row['model_T']:4d} {mode:10s} "
+                f"vars={row['vars']:7d} constrs={row['constrs']:7d} "
+                f"quicksum={row['quicksum']:.3f}s matrix={row['matrix']:.3f}s "
+                f"speedup={row['quicksum'] / row['matrix']:.1f}x"
+            )
+    return rows
+
+
+def measure(generator, params, seed, method, time_limit=None):
+    """Generate one instance and run one method on it.
+
+    ``method`` is ``"FCFS"`` or a Solver mode, optionally suffixed with
+    ``+symmetry`` to add symmetry-breaking constraints and ``+lazy`` for
+    lazy connectivity cuts. Meant to run in a fresh
+    process, so that the peak resident set size belongs to this run only.
+    """
+    testcase = getattr(Testcase, generator)(**params, seed=seed)
+    row = {
+        "generator": generator,
+        "params": params,
+        "seed": seed,
+        "method": method,
+        "G": int(len(testcase.Ng)),
+        "D": int(len(testcase.Md)),
+        "T": testcase.horizon,
+        "build_time": None,
+        "solve_time": None,
+        "objective": None,
+        "gap": None,
+        "status": None,
+        "error": None,
+    }
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if method == "FCFS":
+                start = time.perf_counter()
+                fcfs = FCFS()
+                fcfs.solve(testcase, report=False)
+                row["solve_time"] = time.perf_counter() - start
+                row.update(objective=float(fcfs.objective), status="done")
+            else:
+                # "start+symmetry" runs start mode with symmetry breaking
+                mode, *options = method.split("+")
+                solver = Solver(
+                    mode=mode,
+                    time_limit=time_limit,
+                    threads=1,
+                    symmetry="symmetry" in options,
+                    connectivity="lazy" if "lazy" in options else "pairs",
+                )
+                start = time.perf_counter()
+                solver.build(testcase)
+                row["build_time"] = time.perf_counter() - start
+                row["model_T"] = solver.horizon
+                row["vars"] = solver.model.NumVars
+                row["constrs"] = solver.model.NumConstrs
+                solver.model.params.OutputFlag = 0
+                start = time.perf_counter()
+                solver.optimize()
+                row["solve_time"] = time.perf_counter() - start
+                row["status"] = solver.model.Status
+                if solver.model.SolCount > 0:
+                    row["objective"] = solver.model.ObjVal
+                    row["gap"] = solver.model.MIPGap
+    except Exception as e:
+        row.update(status="error", error=repr(e))
+    # ru_maxrss is in kilobytes on Linux
+    row["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return row
+
+
+def run_suite(
+    suite=SUITE, seeds=(0, 1, 2), methods=("FCFS", "column"), time_limit=60, workers=1
+):
+    """Run every method on every (generator, size, seed) of ``suite``.
+
+    Each run gets its own worker process; keep ``workers`` at 1 when the
+    timings matter.
+    """
+    jobs = [
+        (generator, params, seed, method, time_limit)
+        for generator, sizes in suite.items()
+        for params in sizes
+        for seed in seeds
+        for method in methods
+    ]
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as pool:
+        for row in pool.map(measure, *zip(*jobs)):
+            rows.append(row)
+            figures = " ".join(
+                f"{field}={row[field]:.3f}"
+                for field in ("objective", "gap", "build_time", "solve_time")
+                if row[field] is not None
+            )
+            print(
+                f"{row['generator']:13s} G={row['G']:3d} D={row['D']:3d} "
+                f"T={row['T']:4d} seed={row['seed']} {row['method']:10s} "
+                f"{figures} rss={row['peak_rss_mb']:.0f}MB {row['error'] or ''}"
+            )
+    return rows
+
+
+def _key(row):
+    return (
+        row["generator"],
+        json.dumps(row["params"], sort_keys=True),
+        row["seed"],
+        row["method"],
+    )
+
+
+def write_results(rows, filename):
+    """Write results with the versions they were measured with."""
+    results = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "gurobi": ".".join(map(str, gp.gurobi.version())),
+        "machine": platform.machine(),
+        "rows": sorted(rows, key=_key),
+    }
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def compare(baseline, current, slack=1.5, floor=0.05):
+    """Return the runs of ``current`` that got worse than in ``baseline``.
+
+    A time or memory figure regresses when it grows by more than ``slack``
+    times and by more than ``floor`` in absolute terms; an objective
+    regresses when it gets larger at all, and a run regresses when it
+    starts failing.
+    """
+    with open(baseline) as f:
+        old = {_key(row): row for row in json.load(f)["rows"]}
+    with open(current) as f:
+        new = json.load(f)["rows"]
+
+    regressions = []
+    for row in new:
+        before = old.get(_key(row))
+        if before is None:
+            continue
+        problems = []
+        if row["status"] == "error" and before["status"] != "error":
+            problems.append(f"error: {row['error']}")
+        for field in TIMED:
+            a, b = before.get(field), row.get(field)
+            if a is not None and b is not None and b > a * slack and b - a > floor:
+                problems.append(f"{field} {a:.3f} -> {b:.3f}")
+        a, b = before["objective"], row["objective"]
+        if a is not None and (b is None or b > a + 1e-6):
+            problems.append(f"objective {a} -> {b}")
+        if problems:
+            regressions.append((_key(row), problems))
+            print(f"{_key(row)}: {'; '.join(problems)}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Scaling benchmark over the generators"
+    )
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--methods", nargs="+", default=["FCFS", "column"])
+    parser.add_argument(
+        "--generators", nargs="+", choices=list(SUITE), default=list(SUITE)
+    )
+    parser.add_argument("--time-limit", type=float, default=60)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", metavar="BASELINE", default=None)
+    parser.add_argument(
+        "--builders", action="store_true", help="only time the two model builders"
+    )
+    args = parser.parse_args()
+
+    if args.builders:
+        benchmark_builders(
+            [
+                (10, 6, 12),
+                (20, 12, 12),
+                (30, 12, 12),
+                (30, 12, 24),
+                (30, 20, 24),
+                (50, 20, 36),
+            ]
+        )
+    else:
+        suite = {name: SUITE[name] for name in args.generators}
+        rows = run_suite(suite, args.seeds, args.methods, args.time_limit, args.workers)
+        write_results(rows, args.output)
+        if args.compare:
+            compare(args.compare, args.output)
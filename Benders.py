@@ -0,0 +1,578 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import gurobipy as gp
+from gurobipy import GRB
+import numpy as np
+
+from Combinations import TableCombinations
+from FCFS import FCFS
+from Renderer import Renderer
+from Schedule import Schedule, as_solution
+from Solver import Solver
+from Telemetry import Telemetry
+from Testcase import Testcase
+
+
+class Benders:
+    """Logic-based Benders decomposition of the seating problem.
+
+    The master problem picks one connected table subset per group and an
+    approximate start ``s[g]``, chosen in buckets of ``bucket`` periods
+    (default: the shortest meal) and only bounded below by the earliest
+    valid start in its bucket; each table-bucket must have room for the
+    meals that surely overlap it, and starts on one table are a meal apart.
+    Each group must start inside the bucket
+    the master picked, so only groups that share a table and whose bucket
+    windows overlap can delay each other. The chosen (subset, bucket)
+    pairs split into such clusters, and each cluster is sequenced exactly
+    by a small time-indexed model, in parallel threads.
+
+    An infeasible cluster yields a no-good cut on its (subset, bucket)
+    choices. A cluster whose optimal waiting cost ``C`` exceeds the
+    master's estimate yields ``sum N[g] * s[g] >= C - (C - L) * (number of
+    changed choices)`` over its groups, where ``L`` is the least waiting
+    cost those groups can have at all. Both stay valid when other groups
+    join the cluster later, since extra groups only make sequencing harder.
+    Each cut is first lifted: it is proved again on only the tables a group
+    shares with the rest of its cluster, and if it still holds it covers
+    every subset containing those tables.
+
+    The FCFS plan is the first incumbent, and the master's subsets are
+    sequenced again with free starts whenever they miss their buckets. The
+    master only searches for choices that beat the incumbent; the loop
+    stops once none is left or ``time_limit`` runs out, and keeps the best
+    feasible plan seen.
+    """
+
+    def __init__(
+        self,
+        time_limit=60,
+        bucket=None,
+        workers=None,
+        tolerance=1e-6,
+        output_dir=".",
+        telemetry=None,
+    ):
+        self.time_limit = time_limit
+        self.bucket = bucket
+        self.workers = workers
+        self.tolerance = tolerance
+        self.output_dir = output_dir
+        self.telemetry = telemetry if telemetry is not None else Telemetry()
+        self.objective = None
+        self.bound = None
+        self.iterations = 0
+        self.schedule = None
+        self._local = threading.local()
+        # Environments started by ``_env``, disposed when ``solve`` ends
+        self._envs = []
+
+    def solve(self, testcase):
+        started = time.perf_counter()
+        self.objective = None
+        self.bound = None
+        self.iterations = 0
+        self.schedule = None
+        N = testcase.Ng
+        S = testcase.Sg
+        H = testcase.Hg
+        alpha = testcase.alpha
+        num_groups = int(len(N))
+
+        with self.telemetry.phase("columns"):
+            T_star, _, table_starts, _ = Solver().time_windows(testcase)
+            self.horizon = T_star
+            self.table_starts = table_starts
+            combinations = TableCombinations(testcase.Md, testcase.Cij)
+            self.columns = []
+            self.column_starts = {}
+            for g in range(num_groups):
+                kept = []
+                for tables in combinations.feasible(N[g], H[g]):
+                    common = set.intersection(
+                        *(set(table_starts.get((g, d), ())) for d in tables)
+                    )
+                    if common:
+                        self.column_starts[g, len(kept)] = sorted(common)
+                        kept.append(tables)
+                self.columns.append(kept)
+            # Earliest start of each group over all of its subsets
+            self.first = [
+                min((self.column_starts[g, k][0] for k in range(len(kept))), default=0)
+                for g, kept in enumerate(self.columns)
+            ]
+
+        master, v, s = self._build_master(testcase)
+        cache = {}
+        constant = float(np.dot(N, S))
+        print(f"Benders: {num_groups} groups, {len(v)} master columns")
+
+        with self.telemetry.phase("incumbent"):
+            self._fcfs_start(testcase, v)
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while True:
+                remaining = self.time_limit - (time.perf_counter() - started)
+                if remaining <= 0:
+                    break
+                master.params.TimeLimit = remaining
+                if self.objective is not None:
+                    # Only choices that could beat the incumbent are of interest
+                    master.params.Cutoff = self.objective - self.tolerance
+                with self.telemetry.phase("master", iteration=self.iterations):
+                    master.optimize()
+                if master.SolCount == 0:
+                    if self.objective is not None and master.Status in (
+                        GRB.CUTOFF,
+                        GRB.INFEASIBLE,
+                    ):
+                        # Nothing beats the incumbent
+                        self.bound = self.objective
+                    elif master.Status == GRB.INFEASIBLE:
+                        print("Benders: no assignment passes the master relaxation")
+                        self.bound = GRB.INFINITY
+                    break
+                bound = master.ObjVal if master.Status == GRB.OPTIMAL else master.ObjBound
+                # Cuts only tighten the master; a solve cut short may prove less
+                self.bound = bound if self.bound is None else max(self.bound, bound)
+                values = master.getAttr("X", v)
+                chosen = [key for key, value in values.items() if value > 0.5]
+                choice = {g: k for g, k, _ in chosen}
+                estimate = master.getAttr("X", s)
+
+                components = self._components(chosen, testcase.Pg)
+                exact = {c: self._exact(c) for c in components}
+                pending = [items for items in exact.values() if items not in cache]
+                with self.telemetry.phase("subproblems", count=len(pending)):
+                    results = pool.map(lambda i: self._sequence(testcase, i), pending)
+                    cache.update(zip(pending, results))
+
+                # Shrink infeasible components so their no-goods cut off more
+                infeasible = [c for c in components if cache[exact[c]] is None]
+                with self.telemetry.phase("conflicts", count=len(infeasible)):
+                    conflicts = dict(
+                        zip(
+                            infeasible,
+                            pool.map(
+                                lambda c: self._conflict(testcase, c, cache), infeasible
+                            ),
+                        )
+                    )
+
+                cuts = 0
+                feasible = True
+                cost = constant - alpha * sum(
+                    H[g] - len(self.columns[g][k]) for g, k in choice.items()
+                )
+                starts = {}
+                for component in components:
+                    result = cache[exact[component]]
+                    if result is None:
+                        feasible = False
+                        conflict = conflicts[component]
+                        picked = self._lifted_cut(testcase, conflict, v, cache, None)
+                        master.addConstr(gp.quicksum(picked) <= len(conflict) - 1)
+                        cuts += 1
+                        continue
+                    waiting, component_starts = result
+                    starts.update(component_starts)
+                    cost += waiting
+                    approx = sum(N[g] * estimate[g] for g, _, _ in component)
+                    if waiting > approx + self.tolerance:
+                        picked = self._lifted_cut(testcase, component, v, cache, approx)
+                        if picked is None:
+                            picked = [v[key] for key in component]
+                        else:
+                            waiting, picked = picked
+                        least = sum(N[g] * self.first[g] for g, _, _ in component)
+                        changed = gp.quicksum(1 - p for p in picked)
+                        master.addConstr(
+                            gp.quicksum(N[g] * s[g] for g, _, _ in component)
+                            >= waiting - (waiting - least) * changed
+                        )
+                        cuts += 1
+
+                if feasible and (self.objective is None or cost < self.objective):
+                    self.objective = cost
+                    self.schedule = self._schedule(testcase, choice, starts)
+                if cuts:
+                    with self.telemetry.phase("repair"):
+                        self._repair(testcase, chosen, pool, cache)
+                self.iterations += 1
+                self.telemetry.emit(
+                    "benders_iteration",
+                    iteration=self.iterations,
+                    bound=self.bound,
+                    incumbent=self.objective,
+                    components=len(components),
+                    cuts=cuts,
+                )
+                print(
+                    f"Iteration {self.iterations}: bound {self.bound:.2f}, "
+                    f"best {self.objective}, {len(components)} components, {cuts} cuts"
+                )
+                if cuts == 0 or (
+                    self.objective is not None
+                    and self.objective - self.bound <= self.tolerance
+                ):
+                    break
+        finally:
+            pool.shutdown()
+            self._dispose_envs()
+
+        self.runtime = time.perf_counter() - started
+        self.gap = None
+        # Without a master solve the FCFS incumbent, if any, stands unbounded
+        if self.objective is not None and self.bound is not None:
+            self.gap = abs(self.objective - self.bound) / max(
+                abs(self.objective), 1e-10
+            )
+        master.dispose()
+
+        with open(os.path.join(self.output_dir, "benders.txt"), "w") as f:
+            f.write("Objective Value: " + str(self.objective) + "\n")
+            f.write("Bound: " + str(self.bound) + "\n")
+            f.write("Gap: " + str(self.gap) + "\n")
+            f.write("Iterations: " + str(self.iterations) + "\n")
+            f.write("Runtime: " + str(self.runtime) + "\n")
+
+    def _build_master(self, testcase):
+        """Subset choice with starts rounded down to buckets of ``bucket`` periods.
+
+        ``v[g,k,b]`` picks subset ``k`` for group ``g`` and a start in bucket
+        ``b``; the start ``s[g]`` is at least the earliest valid start in
+        that bucket and is free to rise to meet the optimality cuts. Each
+        table-bucket must have room for the least overlap each meal could
+        have with it, which relaxes the exact per-period capacity.
+        """
+        N = testcase.Ng
+        P = testcase.Pg
+        S = testcase.Sg
+        H = testcase.Hg
+        alpha = testcase.alpha
+        num_groups = int(len(N))
+        num_tables = int(len(testcase.Md))
+        B = self.bucket or max(1, int(np.min(P)))
+        self._B = B
+        num_buckets = -(-self.horizon // B)
+
+        free = np.ones((num_tables, num_buckets * B), dtype=int)
+        free[:, self.horizon :] = 0
+        for d, intervals in enumerate(testcase.blocked):
+            for start, end in intervals:
+                free[d, start:end] = 0
+        room = free.reshape(num_tables, num_buckets, B).sum(axis=2)
+
+        # earliest[g,k,b]: first valid start; overlap[g,k,b][c]: least overlap with bucket c
+        earliest = {}
+        overlap = {}
+        self.bucket_starts = {}
+        for (g, k), valid in self.column_starts.items():
+            by_bucket = {}
+            for t in valid:
+                by_bucket.setdefault(t // B, []).append(t)
+            for b, ts in by_bucket.items():
+                earliest[g, k, b] = ts[0]
+                self.bucket_starts[g, k, b] = tuple(ts)
+                least = {}
+                for c in range(b, min(num_buckets, (ts[-1] + int(P[g]) - 1) // B + 1)):
+                    lo, hi = c * B, (c + 1) * B
+                    least[c] = min(
+                        max(0, min(t + int(P[g]), hi) - max(t, lo)) for t in ts
+                    )
+                overlap[g, k, b] = {c: o for c, o in least.items() if o > 0}
+
+        master = gp.Model("benders_master")
+        master.params.OutputFlag = 0
+        cost = {
+            (g, k, b): -alpha * (H[g] - len(self.columns[g][k]))
+            for (g, k, b) in earliest
+        }
+        v = master.addVars(list(earliest), vtype=GRB.BINARY, obj=cost, name="v")
+        s = master.addVars(num_groups, obj=N, ub=self.horizon, name="s")
+        master.ObjCon = float(np.dot(N, S))
+        master.ModelSense = GRB.MINIMIZE
+
+        master.addConstrs(
+            (v.sum(g, "*", "*") == 1 for g in range(num_groups)), name="single_column"
+        )
+        master.addConstrs(
+            (
+                s[g]
+                >= gp.quicksum(t * v[key] for key, t in earliest.items() if key[0] == g)
+                for g in range(num_groups)
+            ),
+            name="approximate_start",
+        )
+        usage = {}
+        for key, cells in overlap.items():
+            g, k, b = key
+            for d in self.columns[g][k]:
+                for c, o in cells.items():
+                    usage.setdefault((d, c), gp.LinExpr()).addTerms(o, v[key])
+        master.addConstrs(
+            (usage[d, c] <= room[d, c] for (d, c) in usage), name="bucket_capacity"
+        )
+        # Starts on one table are at least a meal apart, so a bucket holds
+        # only a few of them: one with the default bucket length
+        starting = {}
+        for g, k, b in v.keys():
+            for d in self.columns[g][k]:
+                starting.setdefault((d, b), []).append(v[g, k, b])
+        limit = -(-B // int(np.min(P)))
+        master.addConstrs(
+            (
+                gp.quicksum(starting[d, b]) <= limit
+                for d, b in starting
+                if len(starting[d, b]) > limit
+            ),
+            name="bucket_starts",
+        )
+        return master, v, s
+
+    def _fcfs_start(self, testcase, v):
+        """Take the FCFS plan as first incumbent and master start, if it fits the windows."""
+        N = testcase.Ng
+        S = testcase.Sg
+        H = testcase.Hg
+        schedule = Schedule.from_allocation(FCFS().solve(testcase, report=False))
+        choice = {}
+        for g, tables in enumerate(schedule.tables):
+            tables = tuple(sorted(tables))
+            if tables not in self.columns[g]:
+                return
+            k = self.columns[g].index(tables)
+            if schedule.starts[g] not in self.column_starts[g, k]:
+                return
+            choice[g] = k
+        self.objective = float(
+            sum(N[g] * (S[g] + schedule.starts[g]) for g in choice)
+            - testcase.alpha
+            * sum(H[g] - len(self.columns[g][k]) for g, k in choice.items())
+        )
+        schedule.horizon = self.horizon
+        self.schedule = schedule
+        B = self.bucket or max(1, int(np.min(testcase.Pg)))
+        for (g, k, b), var in v.items():
+            var.Start = float(choice[g] == k and schedule.starts[g] // B == b)
+        print(f"FCFS incumbent: {self.objective}")
+
+    def _conflict(self, testcase, component, cache):
+        """Drop groups from an infeasible component while it stays infeasible."""
+        core = list(component)
+        for member in component:
+            trial = self._exact(tuple(m for m in core if m != member))
+            if trial not in cache:
+                cache[trial] = self._sequence(testcase, trial)
+            if cache[trial] is None:
+                core = [m for m in core if m != member]
+        return tuple(core)
+
+    def _repair(self, testcase, chosen, pool, cache):
+        """Sequence the master's subsets with any valid starts; keep the plan if better.
+
+        The buckets are only the master's estimate, so a choice whose
+        clusters could not be sequenced inside them often still gives a
+        good plan once the starts are free.
+        """
+        components = self._components(chosen, testcase.Pg, buckets=False)
+        items = [
+            tuple(
+                (g, tuple(self.columns[g][k]), tuple(self.column_starts[g, k]))
+                for g, k, _ in component
+            )
+            for component in components
+        ]
+        pending = [i for i in items if i not in cache]
+        cache.update(
+            zip(pending, pool.map(lambda i: self._sequence(testcase, i), pending))
+        )
+        results = [cache[i] for i in items]
+        if any(result is None for result in results):
+            return
+        choice = {g: k for g, k, _ in chosen}
+        cost = float(np.dot(testcase.Ng, testcase.Sg)) - testcase.alpha * sum(
+            testcase.Hg[g] - len(self.columns[g][k]) for g, k in choice.items()
+        )
+        starts = {}
+        for waiting, component_starts in results:
+            cost += waiting
+            starts.update(component_starts)
+        if self.objective is None or cost < self.objective - self.tolerance:
+            self.objective = cost
+            self.schedule = self._schedule(testcase, choice, starts)
+
+    def _exact(self, component):
+        """Sequencing items ``(group, tables, starts)`` of chosen (group, column, bucket) keys."""
+        return tuple(
+            (g, tuple(self.columns[g][k]), tuple(self.bucket_starts[g, k, b]))
+            for g, k, b in component
+        )
+
+    def _lifted_cut(self, testcase, component, v, cache, approx):
+        """Try to state a cut over every subset holding the tables a group shares.
+
+        Each group keeps only the tables it shares with the rest of the
+        component, and the starts in its bucket at which those are free. Any
+        column containing them can only do worse, so a bound proved on these
+        relaxed items holds for all of them. Returns the ``v`` sums that pick
+        such columns (with the relaxed waiting cost unless ``approx`` is
+        None, for an infeasible component), or the exact ``v`` if the
+        relaxation proves nothing.
+        """
+        owners = {}
+        for g, k, _ in component:
+            for d in self.columns[g][k]:
+                owners.setdefault(d, set()).add(g)
+        items = []
+        picked = []
+        for g, k, b in component:
+            shared = [d for d in self.columns[g][k] if len(owners[d]) > 1]
+            if not shared:
+                # Alone on its tables: nothing to lift
+                items.append(
+                    (g, tuple(self.columns[g][k]), self.bucket_starts[g, k, b])
+                )
+                picked.append(v[g, k, b])
+                continue
+            common = set.intersection(*(set(self.table_starts[g, d]) for d in shared))
+            starts = sorted(t for t in common if t // self._B == b)
+            items.append((g, tuple(shared), tuple(starts)))
+            picked.append(
+                gp.quicksum(
+                    v[g, j, b]
+                    for j, tables in enumerate(self.columns[g])
+                    if (g, j, b) in v and set(shared) <= set(tables)
+                )
+            )
+        items = tuple(items)
+        if items not in cache:
+            cache[items] = self._sequence(testcase, items)
+        relaxed = cache[items]
+        if approx is None:
+            return picked if relaxed is None else [v[key] for key in component]
+        if relaxed is None or relaxed[0] <= approx + self.tolerance:
+            return None
+        return relaxed[0], picked
+
+    def _components(self, chosen, P, buckets=True):
+        """Split chosen (group, column, bucket) keys into clusters that can clash.
+
+        Two groups clash when they share a table and the periods they can
+        occupy overlap, from their buckets or, without ``buckets``, from
+        all the valid starts of their columns.
+        """
+        chosen = sorted(chosen)
+        parent = list(range(len(chosen)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        on_table = {}
+        for i, (g, k, b) in enumerate(chosen):
+            starts = (
+                self.bucket_starts[g, k, b] if buckets else self.column_starts[g, k]
+            )
+            window = (starts[0], starts[-1] + int(P[g]))
+            for d in self.columns[g][k]:
+                on_table.setdefault(d, []).append((window, i))
+        for meals in on_table.values():
+            meals.sort()
+            end, last = meals[0][0][1], meals[0][1]
+            for (lo, hi), i in meals[1:]:
+                if lo < end:
+                    parent[find(i)] = find(last)
+                if hi > end:
+                    end, last = hi, i
+        members = {}
+        for i, key in enumerate(chosen):
+            members.setdefault(find(i), []).append(key)
+        return [tuple(component) for component in members.values()]
+
+    def _env(self):
+        # Gurobi environments must not be shared between threads
+        if not hasattr(self._local, "env"):
+            env = gp.Env(empty=True)
+            env.setParam("OutputFlag", 0)
+            env.start()
+            self._local.env = env
+            self._envs.append(env)
+        return self._local.env
+
+    def _dispose_envs(self):
+        """Release the environments, and their license tokens, of the last solve."""
+        for env in self._envs:
+            env.dispose()
+        self._envs = []
+        self._local = threading.local()
+
+    def _sequence(self, testcase, items):
+        """Optimal starts for ``(group, tables, starts)`` items; None if they cannot all fit."""
+        N = testcase.Ng
+        P = testcase.Pg
+        if any(not starts for _, _, starts in items):
+            return None
+        if len(items) == 1:
+            g, _, starts = items[0]
+            return N[g] * starts[0], {g: starts[0]}
+
+        model = gp.Model("benders_sequence", env=self._env())
+        model.params.Threads = 1
+        keys = [(g, t) for g, _, starts in items for t in starts]
+        u = model.addVars(
+            keys, vtype=GRB.BINARY, obj={key: N[key[0]] * key[1] for key in keys}
+        )
+        model.addConstrs(u.sum(g, "*") == 1 for g, _, _ in items)
+        occupants = {}
+        for g, tables, starts in items:
+            for t in starts:
+                for d in tables:
+                    for period in range(t, t + P[g]):
+                        occupants.setdefault((d, period), []).append((g, t))
+        model.addConstrs(
+            gp.quicksum(u[key] for key in occupants[cell]) <= 1
+            for cell in occupants
+            if len(occupants[cell]) > 1
+        )
+        model.optimize()
+        if model.SolCount == 0:
+            model.dispose()
+            return None
+        starts = {g: t for (g, t), var in u.items() if var.X > 0.5}
+        waiting = model.ObjVal
+        model.dispose()
+        return waiting, starts
+
+    def _schedule(self, testcase, choice, starts):
+        num_groups = int(len(testcase.Ng))
+        return Schedule(
+            [starts.get(g, -1) for g in range(num_groups)],
+            [self.columns[g][choice[g]] for g in range(num_groups)],
+            testcase.Pg,
+            len(testcase.Md),
+            self.horizon,
+        )
+
+    def to_solution(self, testcase, sparse=False):
+        return as_solution(self.schedule, sparse)
+
+    def draw_solution(self, solution, formats=("png",)):
+        with self.telemetry.phase("draw"):
+            Renderer(self.output_dir, formats).draw_solution(solution, "benders")
+
+
+if __name__ == "__main__":
+    testcase = Testcase.from_csv("testcase_data.csv")
+    benders = Benders()
+    benders.solve(testcase)
+    solution = benders.to_solution(testcase)
+    if solution:
+        benders.draw_solution(solution)
+    else:
+        print("No solution found")
@@ -0,0 +1,224 @@
+import os
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from Combinations import TableCombinations
+from FCFS import FCFS
+from Renderer import Renderer
+from Schedule import Schedule
+from Telemetry import Telemetry
+from Testcase import Testcase
+
+
+class CPSolver:
+    """CP-SAT model of the seating problem with one optional interval per group and table."""
+
+    def __init__(
+        self,
+        warm_start=False,
+        time_limit=None,
+        threads=None,
+        output_dir=".",
+        telemetry=None,
+    ):
+        self.warm_start = warm_start
+        self.time_limit = time_limit
+        self.threads = threads
+        self.output_dir = output_dir
+        self.telemetry = telemetry if telemetry is not None else Telemetry()
+        self.model = None
+        self.solver = None
+        self.horizon = None
+        self.status = None
+        self.objective = None
+        self.bound = None
+        self.gap = None
+        self.runtime = None
+
+    def build(self, testcase):
+        N = testcase.Ng
+        M = testcase.Md
+        P = testcase.Pg
+        U = testcase.Ug
+        S = testcase.Sg
+        H = testcase.Hg
+        alpha = testcase.alpha
+
+        num_groups = int(len(N))
+        num_tables = int(len(M))
+        latest = np.asarray(U) - np.asarray(S)
+        feasible = latest >= 0
+        self.horizon = int(max((latest + P)[feasible], default=max(P)))
+        print(f"Number of groups: {num_groups}")
+        print(f"Number of tables: {num_tables}")
+        print(f"Total time periods: {self.horizon}")
+
+        self.model = cp_model.CpModel()
+        model = self.model
+        combinations = TableCombinations(M, testcase.Cij)
+
+        # Start times; a group already past its maximum wait makes the model infeasible
+        self.s = []
+        for g in range(num_groups):
+            self.s.append(model.new_int_var(0, max(int(latest[g]), 0), f"s[{g}]"))
+            if not feasible[g]:
+                model.add(self.s[g] <= int(latest[g]))
+
+        self.columns = []
+        self.y = []
+        # b[g][d]: whether group g sits at table d
+        self.b = []
+        intervals = [[] for _ in range(num_tables)]
+        for g in range(num_groups):
+            columns = combinations.feasible(N[g], H[g])
+            y = [model.new_bool_var(f"y[{g},{k}]") for k in range(len(columns))]
+            model.add_exactly_one(y)
+            self.columns.append(columns)
+            self.y.append(y)
+            self.b.append({})
+            for d in sorted({d for tables in columns for d in tables}):
+                b = self.b[g][d] = model.new_bool_var(f"b[{g},{d}]")
+                model.add(
+                    b == sum(y[k] for k, tables in enumerate(columns) if d in tables)
+                )
+                intervals[d].append(
+                    model.new_optional_fixed_size_interval_var(
+                        self.s[g], int(P[g]), b, f"meal[{g},{d}]"
+                    )
+                )
+
+        for d, blocked in enumerate(testcase.blocked):
+            for start, end in blocked:
+                if start < self.horizon:
+                    intervals[d].append(
+                        model.new_fixed_size_interval_var(
+                            int(start), int(min(end, self.horizon) - start), ""
+                        )
+                    )
+            model.add_no_overlap(intervals[d])
+
+        wait_time = sum(int(N[g]) * (self.s[g] + int(S[g])) for g in range(num_groups))
+        table_minimization = sum(
+            alpha * (int(H[g]) - len(tables)) * y
+            for g in range(num_groups)
+            for tables, y in zip(self.columns[g], self.y[g])
+        )
+        model.minimize(wait_time - table_minimization)
+
+    def solve(self, testcase):
+        self.objective = self.bound = self.gap = None
+        with self.telemetry.phase("build"):
+            self.build(testcase)
+        if self.warm_start:
+            with self.telemetry.phase("warm_start"):
+                allocation = FCFS().solve(testcase, report=False)
+                self.set_start(testcase, Schedule.from_allocation(allocation))
+
+        self.solver = cp_model.CpSolver()
+        if self.time_limit is not None:
+            self.solver.parameters.max_time_in_seconds = self.time_limit
+        self.solver.parameters.num_workers = self.threads or os.cpu_count() or 1
+
+        with self.telemetry.phase("optimize"):
+            status = self.solver.solve(self.model, _Progress(self.telemetry))
+        self.status = self.solver.status_name(status)
+        self.runtime = self.solver.wall_time
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            self.objective = self.solver.objective_value
+            self.bound = self.solver.best_objective_bound
+            self.gap = abs(self.objective - self.bound) / max(
+                abs(self.objective), 1e-10
+            )
+        self.telemetry.emit(
+            "result",
+            status=self.status,
+            objective=self.objective,
+            gap=self.gap,
+            bound=self.bound,
+            runtime=self.runtime,
+            branches=self.solver.num_branches,
+        )
+
+        with open(os.path.join(self.output_dir, "cpsat.txt"), "w") as f:
+            f.write("Objective Value: " + str(self.objective) + "\n")
+            if self.objective is not None:
+                f.write("Gap: " + str(self.gap) + "\n")
+            f.write("Bound: " + str(self.bound) + "\n")
+            f.write("Runtime: " + str(self.runtime) + "\n")
+
+    def set_start(self, testcase, schedule):
+        """Hint ``schedule`` to the search; groups it seats outside the model are skipped."""
+        hinted = 0
+        for g, tables in enumerate(schedule.tables):
+            tables = tuple(sorted(tables))
+            if schedule.starts[g] < 0 or tables not in self.columns[g]:
+                continue
+            self.model.add_hint(self.s[g], int(schedule.starts[g]))
+            k = self.columns[g].index(tables)
+            for i, y in enumerate(self.y[g]):
+                self.model.add_hint(y, i == k)
+            hinted += 1
+        print(f"Hint covers {hinted} of {len(schedule)} groups")
+
+    def report(self):
+        if self.status == "OPTIMAL":
+            print("Optimal solution found")
+        elif self.objective is not None:
+            print(f"Feasible solution found, gap {self.gap:.4f}")
+        else:
+            print("No optimal solution found")
+
+    def to_solution(self, testcase, sparse=False):
+        """Return the dense ``a``/``b``/``x``/``c`` arrays, or a ``Schedule``."""
+        if self.objective is None:
+            return None
+
+        with self.telemetry.phase("extract"):
+            num_groups = len(self.s)
+            starts = [self.solver.value(self.s[g]) for g in range(num_groups)]
+            tables = [
+                [d for d, b in self.b[g].items() if self.solver.value(b)]
+                for g in range(num_groups)
+            ]
+            schedule = Schedule(
+                starts, tables, testcase.Pg, len(testcase.Md), self.horizon
+            )
+            return schedule if sparse else schedule.to_solution()
+
+    def draw_solution(self, solution, formats=("png",)):
+        """Save the Gantt chart of a dense solution or ``Schedule`` as ``cpsat.<format>``."""
+        with self.telemetry.phase("draw"):
+            Renderer(self.output_dir, formats).draw_solution(solution, "cpsat")
+
+
+class _Progress(cp_model.CpSolverSolutionCallback):
+    """Record every improving CP-SAT solution as an ``incumbent`` event."""
+
+    def __init__(self, telemetry):
+        super().__init__()
+        self.telemetry = telemetry
+
+    def on_solution_callback(self):
+        self.telemetry.emit(
+            "incumbent",
+            objective=self.objective_value,
+            bound=self.best_objective_bound,
+            runtime=self.wall_time,
+        )
+
+
+if __name__ == "__main__":
+    telemetry = Telemetry("telemetry.jsonl")
+    with telemetry.phase("load"):
+        testcase = Testcase.from_csv("testcase_data.csv")
+
+    solver = CPSolver(telemetry=telemetry)
+    solver.solve(testcase)
+    solver.report()
+    solution = solver.to_solution(testcase)
+    if solution:
+        solver.draw_solution(solution)
+    else:
+        print("No solution found")
+    telemetry.close()
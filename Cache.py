@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from Schedule import Schedule
+
+
+class Cache:
+    """On-disk cache of solved instances, keyed by content.
+
+    The key is a SHA-256 over the instance arrays, the blocked intervals,
+    ``horizon`` and ``alpha``, plus the method name and its options, so an
+    instance generated twice with the same seed hits the same entry. Each
+    entry is one ``<key>.npz`` holding the schedule as flat integer arrays
+    and a JSON string of metadata (objective, status, runtime, ...).
+
+    Reading an entry refreshes its modification time; once the directory
+    grows past ``max_bytes`` the least recently used entries are deleted.
+    """
+
+    def __init__(self, directory=None, max_bytes=256 * 2**20):
+        if directory is None:
+            directory = os.path.join(os.path.expanduser("~"), ".cache", "seating")
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(testcase, method, options=None):
+        """Stable hex digest of ``testcase`` solved by ``method`` with ``options``."""
+        digest = hashlib.sha256()
+        for name in ("Ng", "Md", "Cij", "Pg", "Ug", "Sg", "Hg"):
+            values = np.ascontiguousarray(getattr(testcase, name), dtype=np.int64)
+            digest.update(name.encode())
+            digest.update(str(values.shape).encode())
+            digest.update(values.tobytes())
+        for intervals in testcase.blocked:
+            digest.update(np.asarray(intervals, dtype=np.int64).tobytes() + b";")
+        digest.update(f"{testcase.horizon}|{float(testcase.alpha)!r}".encode())
+        digest.update(method.encode())
+        digest.update(json.dumps(options or {}, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key):
+        """Return ``(schedule, metadata)`` for ``key``, or None on a miss."""
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                meta = json.loads(str(data["meta"]))
+                offsets = data["offsets"]
+                tables = np.split(data["tables"], offsets[1:-1])
+                schedule = Schedule(
+                    data["starts"],
+                    tables,
+                    data["durations"],
+                    meta["num_tables"],
+                    meta["horizon"],
+                )
+            os.utime(path)
+        except (OSError, KeyError, ValueError):
+            return None
+        return schedule, meta
+
+    def put(self, key, schedule, **meta):
+        """Store ``schedule`` with ``meta`` under ``key`` and evict if over budget."""
+        meta.update(
+            num_tables=schedule.num_tables, horizon=schedule.horizon, stored=time.time()
+        )
+        sizes = [len(tables) for tables in schedule.tables]
+        path = self._path(key)
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            np.savez_compressed(
+                f,
+                starts=schedule.starts.astype(np.int32),
+                durations=schedule.durations.astype(np.int32),
+                tables=np.array(
+                    [d for tables in schedule.tables for d in tables], dtype=np.int32
+                ),
+                offsets=np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+                meta=np.array(json.dumps(meta, default=float)),
+            )
+        # Readers never see a half-written entry
+        os.replace(partial, path)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits ``max_bytes``."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass  # another process evicted it first
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                os.remove(os.path.join(self.directory, name))
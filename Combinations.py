@@ -0,0 +1,74 @@
+import numpy as np
+
+
+class TableCombinations:
+    """Connected table subsets of a floor plan that can seat a group.
+
+    Subsets are grown one adjacent table at a time along ``Cij``, so every
+    subset produced is connected. Growth stops as soon as a subset has
+    enough seats, and a branch is cut when even the largest remaining
+    tables could not bring it up to the party size. Subsets that contain a
+    smaller feasible subset are dropped: using more tables never lowers the
+    objective.
+
+    Results depend only on the floor plan, so they are cached per
+    (party size, table limit) and shared by every group with that profile.
+    """
+
+    def __init__(self, Md, Cij):
+        self.Md = np.asarray(Md)
+        self.Cij = np.asarray(Cij)
+        num_tables = len(self.Md)
+        self.neighbors = [
+            [j for j in range(num_tables) if j != i and self.Cij[i, j] == 1]
+            for i in range(num_tables)
+        ]
+        # best[k]: seats offered by the k largest tables
+        self.best = np.concatenate([[0], np.cumsum(np.sort(self.Md)[::-1])])
+        self._cache = {}
+
+    def feasible(self, n, h):
+        """Return sorted table tuples with at least ``n`` seats and at most ``h`` tables.
+
+        Candidates are ordered by number of tables, then by seats, so the
+        first available one wastes the fewest tables and seats.
+        """
+        h = int(min(h, len(self.Md)))
+        key = (int(n), h)
+        if key not in self._cache:
+            self._cache[key] = self._enumerate(*key)
+        return self._cache[key]
+
+    def _enumerate(self, n, h):
+        found = []
+        seen = set()
+        frontier = [(d,) for d in range(len(self.Md))]
+        while frontier:
+            grown = []
+            for tables in frontier:
+                key = frozenset(tables)
+                if key in seen:
+                    continue
+                seen.add(key)
+                seats = sum(self.Md[d] for d in tables)
+                if seats >= n:
+                    found.append(tables)
+                    continue
+                if len(tables) >= h or seats + self.best[h - len(tables)] < n:
+                    continue
+                for d in tables:
+                    for j in self.neighbors[d]:
+                        if j not in key:
+                            grown.append(tuple(sorted(tables + (j,))))
+            frontier = grown
+
+        # Keep only inclusion-minimal subsets
+        found_sets = [frozenset(tables) for tables in found]
+        minimal = [
+            tables
+            for tables, key in zip(found, found_sets)
+            if not any(other < key for other in found_sets)
+        ]
+        return sorted(
+            minimal, key=lambda ts: (len(ts), sum(self.Md[d] for d in ts), ts)
+        )
@@ -1,16 +1,38 @@
+import os
+import time
 from Testcase import Testcase
+from Occupancy import Occupancy
+from Renderer import Renderer
+from Schedule import Schedule
+from Telemetry import Telemetry
+from Validator import Validator
 import numpy as np
-import matplotlib.pyplot as plt
 
 
 class FCFS:
-    def solve(self, testcase):
+    def __init__(self, output_dir=".", telemetry=None, cache=None):
+        self.output_dir = output_dir
+        self.telemetry = telemetry if telemetry is not None else Telemetry()
+        self.cache = cache
+        self.objective = None
+        # Metadata of a result served from the cache
+        self.cached = None
+
+    def solve(self, testcase, report=True):
+        key = None
+        self.cached = None
+        if self.cache is not None:
+            key = self.cache.key(testcase, "fcfs")
+            with self.telemetry.phase("cache"):
+                hit = self.cache.get(key)
+            if hit is not None:
+                return self._from_cache(*hit, report)
+        started = time.perf_counter()
+
         # Number of customers in group g
         N = testcase.Ng
         # Number of seats of table d
         M = testcase.Md
-        # Binary variable, 1 if tables i and j can be combined for larger groups, 0 otherwise.
-        C = testcase.Cij
         # Meal duration for group g, measured in time periods.
         P = testcase.Pg
         # Maximum waiting time allowed for group g before seating, measured in time periods.
@@ -21,13 +43,14 @@ class FCFS:
         # R = testcase.Rg
         # Maximum number of tables group g is willing to be assigned to.
         H = testcase.Hg
-        # Binary variable, 1 if table d is occupied at time t, 0 otherwise.
-        O = testcase.Odt
+        # Blocked intervals of each table, as bitmasks over the time periods.
+        # Bookings go into a private copy so the testcase is never mutated.
+        O = Occupancy.from_intervals(testcase.blocked, testcase.horizon)
         alpha = testcase.alpha
 
         G = len(N)  # Number of groups
         D = len(M)  # Number of tables
-        T = len(O[0])  # Number of time periods
+        T = O.horizon  # Number of time periods
 
         # Sort groups by their waiting time S in descending order, keeping track of original indices
         zipped_lists = zip(range(G), S - U, S, N, P, U, H)
@@ -39,107 +62,75 @@ class FCFS:
         # Initialize a_{gdt} as a 3D array of zeros
         a = np.zeros((G, D, T), dtype=int)
 
-        # Function to check if the tables form a connected component
-        def is_connected(tables):
-            if len(tables) <= 1:
-                return True
-            visited = set()
-            to_visit = [tables[0]]
-            while to_visit:
-                current = to_visit.pop()
-                visited.add(current)
-                for neighbor in tables:
-                    if (
-                        neighbor != current
-                        and C[current][neighbor] == 1
-                        and neighbor not in visited
-                    ):
-                        to_visit.append(neighbor)
-            return len(visited) == len(tables)
-
-        # Function to check if the group can be seated at the given tables
-        def can_seat_group_at_tables(g, t, tables):
-            total_seats = sum(M[d] for d in tables)
-            if total_seats < N[g]:
-                return False
-            if t + P[g] > T:
-                return False
-            for d in tables:
-                if any(O[d][t : t + P[g]] == 1):
-                    return False
-            return is_connected(tables)
+        # Connected table subsets that can ever host each group, with their
+        # earliest start before anyone is seated
+        with self.telemetry.phase("presolve"):
+            presolve = testcase.presolve()
 
         # Function to seat group at the given tables
         def seat_group_at_tables(g, t, tables):
-            for d in tables:
-                for duration in range(P[g]):
-                    a[g][d][t + duration] = 1
-                    O[d][t + duration] = 1
-
-        # Recursive function to find combinations of tables
-        def find_table_combinations(g, t, current_tables, start_index):
-            if can_seat_group_at_tables(g, t, current_tables):
-                seat_group_at_tables(g, t, current_tables)
-                return True
-            for i in range(start_index, D):
-                if len(current_tables) < H[g]:
-                    new_tables = current_tables + [i]
-                    if find_table_combinations(g, t, new_tables, i + 1):
-                        return True
-            return False
+            a[g, list(tables), t : t + P[g]] = 1
+            O.book(tables, t, P[g])
 
         # Attempt to allocate groups to tables based on FCFS
-        for g in range(G):
-            allocated = False
-            for t in range(T):
-                if allocated:
-                    break
-                for d in range(D):
-                    if O[d][t] == 0 and N[g] <= M[d]:
-                        # Check if the table is available for the entire duration of the meal
-                        if t + P[g] <= T and all(O[d][t : t + P[g]] == 0):
-                            # Allocate table d to group g at time t for the entire meal duration
-                            seat_group_at_tables(g, t, [d])
-                            allocated = True
-                            break
-                    if not allocated:
-                        if find_table_combinations(g, t, [d], d + 1):
-                            allocated = True
-                            break
-
-        # Calculate and print waiting times
-        waiting_times = []
-        for g in range(G):
-            start_time = None
-            for t in range(T):
-                if any(a[g][d][t] == 1 for d in range(D)):
-                    start_time = t
-                    break
-            if start_time is not None:
-                waiting_time = N[g] * (S[g] + start_time)
-                waiting_times.append(waiting_time)
-            else:
-                waiting_times.append(None)
-
-        # Calculate the penalty of splitting a group across multiple tables
-        # (H[g]-gp.quicksum(b[g, d] for d in range(num_tables)))
-        penalty = 0
-        for g in range(G):
-            tables = []
-            for d in range(D):
-                if any(a[g][d] == 1):
-                    tables.append(d)
-            penalty += H[g] - len(tables)
-
-        # Re-sort waiting times and allocation matrix to original group order
-        original_order_indices = np.argsort(original_indices)
-        waiting_times = [waiting_times[i] for i in original_order_indices]
-        a = a[original_order_indices]
+        with self.telemetry.phase("search", groups=G):
+            for g in range(G):
+                # Earliest start over all candidates; ties go to the fewest tables
+                best = None
+                candidates = presolve.subsets[original_indices[g]]
+                tried = 0
+                for tables, first in zip(
+                    candidates, presolve.first[original_indices[g]]
+                ):
+                    if best is not None and first >= best[0]:
+                        continue  # bookings only delay it, so it cannot win
+                    tried += 1
+                    t = O.earliest_start(tables, P[g], after=first)
+                    if t is not None and (best is None or t < best[0]):
+                        best = (t, tables)
+                        if t == 0:
+                            break  # nothing can start earlier
+                if best is not None:
+                    seat_group_at_tables(g, *best)
+                self.telemetry.emit(
+                    "fcfs_group",
+                    group=original_indices[g],
+                    candidates=len(candidates),
+                    tried=tried,
+                    start=None if best is None else best[0],
+                    tables=None if best is None else list(best[1]),
+                )
+
+        with self.telemetry.phase("evaluate"):
+            # Back to the original group order before scoring the plan
+            original_order_indices = np.argsort(original_indices)
+            a = a[original_order_indices]
+            validator = Validator(testcase, ignore=("wait",))
+            schedule = Schedule.from_allocation(a)
+            seated = schedule.starts >= 0
+            waiting = validator.waiting(schedule)
+            waiting_times = [waiting[g] if seated[g] else None for g in range(G)]
+            penalty = validator.penalty(schedule)
+            violations = validator.check(schedule)
+            self.telemetry.emit("validation", violations=violations)
+
+        self.objective = sum(filter(None, waiting_times)) - alpha * penalty
+        self.telemetry.emit("result", objective=self.objective, penalty=penalty)
+        if key is not None:
+            self.cache.put(
+                key,
+                schedule,
+                objective=float(self.objective),
+                penalty=float(penalty),
+                runtime=time.perf_counter() - started,
+            )
+        if not report:
+            return a
 
         print("Sorted Wait Times (S):", S)
         print("Group Sizes (N):", N)
         print("Meal Durations (P):", P)
-        print("Occupancy Matrix (O):", O)
+        print("Occupancy Matrix (O):", O.to_array())
         print("Allocation Matrix (a):")
         for m in a:
             print(m)
@@ -147,12 +138,14 @@ class FCFS:
         print("Total Waiting Time:", sum(filter(None, waiting_times)))
         print("Penalty:", penalty)
         print("Objective Value:", sum(filter(None, waiting_times)) - alpha * penalty)
+        if violations:
+            print("Violations:", violations)
         # write to file
-        with open("FCFS.txt", "w") as f:
+        with open(os.path.join(self.output_dir, "FCFS.txt"), "w") as f:
             f.write("Sorted Wait Times (S):" + str(S) + "\n")
             f.write("Group Sizes (N):" + str(N) + "\n")
             f.write("Meal Durations (P):" + str(P) + "\n")
-            f.write("Occupancy Matrix (O):" + str(O) + "\n")
+            f.write("Occupancy Matrix (O):" + str(O.to_array()) + "\n")
             f.write("Allocation Matrix (a):" + str(a) + "\n")
             f.write("Waiting Times:" + str(waiting_times) + "\n")
             f.write("Total Waiting Time:" + str(sum(filter(None, waiting_times))) + "\n")
@@ -161,47 +154,30 @@ class FCFS:
             
         return a
 
-    def draw_solution(self, solution):
-        a = solution["a"]
-        num_groups = len(a)
-        num_tables = len(a[0])
-        T_star = len(a[0][0])
-
-        fig, gnt = plt.subplots()
-
-        gnt.set_xlabel("Time")
-        gnt.set_ylabel("Tables")
-
-        gnt.set_xticks(np.arange(0, T_star, step=1))
-        gnt.set_yticks(np.arange(0, num_tables, step=1))
-        gnt.set_xticklabels(np.arange(0, T_star, step=1))
-        gnt.set_yticklabels(np.arange(0, num_tables, step=1))
-
-        gnt.grid(True)
-
-        colors = plt.cm.get_cmap("tab20", num_groups)
-
-        for g in range(num_groups):
-            for d in range(num_tables):
-                for t in range(T_star):
-                    if a[g, d, t] > 0.5:
-                        gnt.broken_barh([(t, 1)], (d - 0.4, 0.8), facecolors=colors(g))
-
-        # Add legend
-        legend_elements = [
-            plt.Rectangle((0, 0), 1, 1, facecolor=colors(g)) for g in range(num_groups)
-        ]
-        legend_labels = [f"Group {g+1}" for g in range(num_groups)]
-        gnt.legend(legend_elements, legend_labels)
+    def _from_cache(self, schedule, meta, report):
+        self.cached = meta
+        self.objective = meta["objective"]
+        self.telemetry.emit("cache_hit", **meta)
+        a = schedule.to_solution()["a"].astype(int)
+        if report:
+            print("Cached result from", time.ctime(meta["stored"]))
+            print("Objective Value:", self.objective)
+            with open(os.path.join(self.output_dir, "FCFS.txt"), "w") as f:
+                f.write("Objective Value:" + str(self.objective))
+        return a
 
-        plt.savefig("FCFS.png")
-        plt.show()
+    def draw_solution(self, solution, formats=("png",)):
+        with self.telemetry.phase("draw"):
+            Renderer(self.output_dir, formats).draw_solution(solution, "FCFS")
 
 
 if __name__ == "__main__":
-    testcase = Testcase.from_csv("testcase_data.csv")
-    solver = FCFS()
+    telemetry = Telemetry("telemetry.jsonl")
+    with telemetry.phase("load"):
+        testcase = Testcase.from_csv("testcase_data.csv")
+    solver = FCFS(telemetry=telemetry)
     a = solver.solve(testcase)
 
     if a is not None:
         solver.draw_solution({"a": a})
+    telemetry.close()
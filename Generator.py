@@ -0,0 +1,312 @@
+import argparse
+import heapq
+import json
+import math
+import os
+
+import numpy as np
+
+from Combinations import TableCombinations
+from Occupancy import Occupancy
+from Testcase import Testcase
+
+
+class FloorPlan:
+    """Table layout: which tables can be joined, and the seat mix of each block.
+
+    ``Cij`` is fixed; ``seats`` lists ``(count, mix)`` blocks in table order,
+    where ``mix`` is a number of seats or a ``{seats: weight}`` dict, so the
+    seats of a plan are drawn afresh for every instance by ``draw_seats``.
+    Plans are combined with ``+``; tables of different plans cannot be
+    joined.
+    """
+
+    def __init__(self, Cij, seats):
+        self.Cij = np.asarray(Cij, dtype=np.uint8)
+        self.seats = list(seats)
+
+    def __len__(self):
+        return len(self.Cij)
+
+    def __add__(self, other):
+        Cij = np.zeros((len(self) + len(other),) * 2, dtype=np.uint8)
+        Cij[: len(self), : len(self)] = self.Cij
+        Cij[len(self) :, len(self) :] = other.Cij
+        return FloorPlan(Cij, self.seats + other.seats)
+
+    def draw_seats(self, rng):
+        return np.concatenate([_draw(rng, count, mix) for count, mix in self.seats])
+
+    @staticmethod
+    def grid(rows, cols, seats=4):
+        """``rows`` x ``cols`` tables, each joinable with its four neighbours."""
+        index = np.arange(rows * cols).reshape(rows, cols)
+        Cij = np.eye(rows * cols, dtype=np.uint8)
+        for i, j in (
+            (index[:, :-1], index[:, 1:]),
+            (index[:-1, :], index[1:, :]),
+        ):
+            Cij[i.ravel(), j.ravel()] = 1
+            Cij[j.ravel(), i.ravel()] = 1
+        return FloorPlan(Cij, [(rows * cols, seats)])
+
+    @staticmethod
+    def chain(length, seats=2):
+        """A row of ``length`` tables, each joinable with the next one (a bar)."""
+        return FloorPlan.grid(1, length, seats)
+
+    @staticmethod
+    def booths(count, seats=6):
+        """``count`` tables that can never be joined."""
+        return FloorPlan(np.eye(count, dtype=np.uint8), [(count, seats)])
+
+
+class Generator:
+    """Random instances on a fixed ``FloorPlan``.
+
+    All draws are array operations; only the first-come seating pass that
+    sets ``Ug`` loops over the groups.
+
+    - Group sizes and table limits ``Hg`` are drawn from ``sizes`` and
+      ``max_tables``: a number or a ``{value: weight}`` dict.
+    - Groups arrive as a Poisson process with ``arrival_rate`` groups per
+      period; the instance is the queue when the last one arrives, so
+      ``Sg`` is the time each group has already waited.
+    - Meal durations follow a gamma distribution with ``duration_mean``
+      and ``duration_shape``, rounded to at least one period.
+    - The horizon leaves ``slack`` times the table-periods the groups need.
+      Reservations block about a ``reserved`` fraction of it on each table,
+      in intervals as long as a meal.
+    - Each group will wait ``patience`` more periods, drawn uniformly from
+      the closed range, past the start a first-come first-served plan of
+      the queue gives it, so every instance is feasible. A group no
+      connected subset of ``Hg`` tables can seat may use more tables.
+
+    Instances only depend on ``seed``. ``stream`` writes them one at a time
+    with ``Testcase.save``, so only one instance is ever held in memory.
+    """
+
+    def __init__(
+        self,
+        plan,
+        num_groups,
+        sizes={1: 1, 2: 4, 3: 2, 4: 3, 5: 1, 6: 1},
+        max_tables=3,
+        arrival_rate=1.0,
+        duration_mean=4.0,
+        duration_shape=4.0,
+        patience=(4, 12),
+        reserved=0.05,
+        slack=2.0,
+        alpha=0.1,
+        seed=None,
+    ):
+        self.plan = plan
+        self.num_groups = int(num_groups)
+        self.sizes = sizes
+        self.max_tables = max_tables
+        self.arrival_rate = float(arrival_rate)
+        self.duration_mean = float(duration_mean)
+        self.duration_shape = float(duration_shape)
+        self.patience = tuple(patience)
+        self.reserved = float(reserved)
+        self.slack = float(slack)
+        self.alpha = alpha
+        # Keeps the entropy drawn for seed=None, so streams can be replayed
+        self.seeds = np.random.SeedSequence(seed)
+
+    def _durations(self, rng, count):
+        scale = self.duration_mean / self.duration_shape
+        durations = np.rint(rng.gamma(self.duration_shape, scale, count))
+        return np.maximum(durations, 1).astype(np.int64)
+
+    def generate(self, rng=None):
+        """Draw one ``Testcase``; ``rng`` defaults to a fresh child of ``seed``."""
+        if rng is None:
+            rng = np.random.default_rng(self.seeds.spawn(1)[0])
+        G = self.num_groups
+        D = len(self.plan)
+        Md = self.plan.draw_seats(rng)
+        Ng = _draw(rng, G, self.sizes)
+        Hg = _draw(rng, G, self.max_tables)
+        Pg = self._durations(rng, G)
+        arrivals = np.cumsum(rng.exponential(1 / self.arrival_rate, G))
+        Sg = np.floor(arrivals[-1] - arrivals).astype(np.int64)
+
+        # Table-periods each group needs, at the average table size
+        need = np.sum(np.ceil(Ng / Md.mean()) * Pg)
+        horizon = int(math.ceil(self.slack * need / D)) + int(Pg.max())
+
+        # Reservations, already sorted by table since tables are repeated in order
+        counts = rng.poisson(self.reserved * horizon / self.duration_mean, D)
+        starts = rng.integers(0, horizon, counts.sum())
+        ends = np.minimum(starts + self._durations(rng, len(starts)), horizon)
+        split = np.cumsum(counts)[:-1]
+        blocked = [
+            list(zip(s.tolist(), e.tolist()))
+            for s, e in zip(np.split(starts, split), np.split(ends, split))
+        ]
+
+        first = self._first_come(Md, Ng, Pg, Hg, blocked, horizon)
+        low, high = self.patience
+        Ug = Sg + first + rng.integers(low, high + 1, G)
+        horizon = max(horizon, int(np.max(first + Pg)))
+
+        return Testcase(
+            Ng,
+            Md,
+            self.plan.Cij,
+            Pg,
+            Ug,
+            Sg,
+            Hg,
+            None,
+            self.alpha,
+            blocked=blocked,
+            horizon=horizon,
+        )
+
+    def _first_come(self, Md, Ng, Pg, Hg, blocked, horizon):
+        """Start of each group when the queue is seated in arrival order.
+
+        Every group takes the earliest start any of its table subsets
+        offers; ``Hg`` is raised in place for groups it leaves no subset.
+        As in ``FCFS``, the last start found for a subset is a lower bound
+        on its next one, since bookings only delay it. Groups of one
+        profile share a heap of those bounds, so a group only recomputes
+        the subsets that could still beat the best start found so far. The
+        occupancy is doubled whenever the queue overflows it.
+        """
+        combinations = TableCombinations(Md, self.plan.Cij)
+        occupancy = Occupancy.from_intervals(blocked, horizon)
+        first = np.zeros(len(Ng), dtype=np.int64)
+        # (size, table limit, duration) -> heap of (start bound, subset index)
+        bounds = {}
+        for g in range(len(Ng)):
+            while not combinations.feasible(Ng[g], Hg[g]):
+                if Hg[g] >= len(Md):
+                    raise ValueError(f"No tables of the plan can seat {Ng[g]} people")
+                Hg[g] += 1
+            subsets = combinations.feasible(Ng[g], Hg[g])
+            profile = (int(Ng[g]), int(Hg[g]), int(Pg[g]))
+            if profile not in bounds:
+                bounds[profile] = [(0, k) for k in range(len(subsets))]
+            heap = bounds[profile]
+            # Ties go to the earlier subset, which uses the fewest tables
+            best = None
+            tried = []
+            while heap and (best is None or heap[0] < best):
+                bound, k = heapq.heappop(heap)
+                t = occupancy.earliest_start(subsets[k], Pg[g], after=bound)
+                while t is None:
+                    occupancy.horizon *= 2
+                    t = occupancy.earliest_start(subsets[k], Pg[g], after=bound)
+                tried.append((t, k))
+                best = min(best or (t, k), (t, k))
+            for item in tried:
+                heapq.heappush(heap, item)
+            occupancy.book(subsets[best[1]], best[0], Pg[g])
+            first[g] = best[0]
+        return first
+
+    def stream(self, directory, count, prefix="testcase"):
+        """Write ``count`` instances to ``directory`` as ``.npz``; yield each path.
+
+        Instance ``i`` is drawn from the ``i``-th child of ``seed``, so any
+        single file can be regenerated without the others. The parameters
+        go to ``generator.json`` next to the instances.
+        """
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "generator.json"), "w") as f:
+            json.dump(self.describe(count), f, indent=2, default=str)
+        children = np.random.SeedSequence(self.seeds.entropy).spawn(count)
+        for i, child in enumerate(children):
+            testcase = self.generate(np.random.default_rng(child))
+            path = os.path.join(directory, f"{prefix}_{i:05d}.npz")
+            testcase.save(path)
+            yield path
+
+    def describe(self, count=None):
+        return {
+            "count": count,
+            "num_tables": len(self.plan),
+            "seats": self.plan.seats,
+            "num_groups": self.num_groups,
+            "sizes": self.sizes,
+            "max_tables": self.max_tables,
+            "arrival_rate": self.arrival_rate,
+            "duration_mean": self.duration_mean,
+            "duration_shape": self.duration_shape,
+            "patience": self.patience,
+            "reserved": self.reserved,
+            "slack": self.slack,
+            "alpha": self.alpha,
+            "seed": self.seeds.entropy,
+        }
+
+
+def _draw(rng, count, mix):
+    """``count`` values from ``mix``: a constant, or a ``{value: weight}`` dict."""
+    if not isinstance(mix, dict):
+        return np.full(count, int(mix), dtype=np.int64)
+    values = np.array(list(mix), dtype=np.int64)
+    weights = np.array(list(mix.values()), dtype=float)
+    return rng.choice(values, count, p=weights / weights.sum())
+
+
+def _mix(text):
+    """Parse ``"4"`` or ``"2:1,4:3"`` into a number or a ``{value: weight}`` dict."""
+    if ":" not in text:
+        return int(text)
+    pairs = (item.split(":") for item in text.split(","))
+    return {int(value): float(weight) for value, weight in pairs}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Stream random instances on a parametric floor plan to disk"
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--groups", type=int, default=2000)
+    parser.add_argument(
+        "--grid", action="append", default=[], help="ROWSxCOLS, may be repeated"
+    )
+    parser.add_argument("--chain", action="append", type=int, default=[])
+    parser.add_argument("--booths", type=int, default=0)
+    parser.add_argument("--seats", type=_mix, default={2: 1, 4: 2})
+    parser.add_argument("--booth-seats", type=_mix, default=6)
+    parser.add_argument(
+        "--sizes", type=_mix, default={1: 1, 2: 4, 3: 2, 4: 3, 5: 1, 6: 1}
+    )
+    parser.add_argument("--max-tables", type=_mix, default=3)
+    parser.add_argument("--arrival-rate", type=float, default=1.0)
+    parser.add_argument("--duration-mean", type=float, default=4.0)
+    parser.add_argument("--patience", type=int, nargs=2, default=(4, 12))
+    parser.add_argument("--reserved", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    plans = [FloorPlan.grid(*map(int, g.split("x")), args.seats) for g in args.grid]
+    plans += [FloorPlan.chain(length, args.seats) for length in args.chain]
+    if args.booths:
+        plans.append(FloorPlan.booths(args.booths, args.booth_seats))
+    if not plans:
+        plans = [FloorPlan.grid(10, 10, args.seats)]
+    plan = plans[0]
+    for other in plans[1:]:
+        plan = plan + other
+
+    generator = Generator(
+        plan,
+        args.groups,
+        sizes=args.sizes,
+        max_tables=args.max_tables,
+        arrival_rate=args.arrival_rate,
+        duration_mean=args.duration_mean,
+        patience=args.patience,
+        reserved=args.reserved,
+        seed=args.seed,
+    )
+    for path in generator.stream(args.directory, args.count):
+        print(path, f"{os.path.getsize(path) / 1024:.0f} KiB")
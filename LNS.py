@@ -0,0 +1,346 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import gurobipy as gp
+from gurobipy import GRB
+import numpy as np
+
+from Combinations import TableCombinations
+from FCFS import FCFS
+from Occupancy import Occupancy
+from Renderer import Renderer
+from Schedule import Schedule, as_solution
+from Telemetry import Telemetry
+from Testcase import Testcase
+from Validator import Validator
+
+NEIGHBOURHOODS = ("window", "tables", "groups")
+REPAIRS = ("greedy", "mip")
+
+
+class LNS:
+    """Anytime large neighbourhood search starting from the FCFS plan.
+
+    Each move removes part of the plan -- the groups eating during a time
+    window, the groups on a cluster of adjacent tables, or a handful of the
+    groups that wait longest -- and seats them again, either greedily in a
+    random order or with a small MIP over the periods left free. Moves that
+    do not make the objective worse are kept, so the search can walk across
+    plateaus.
+
+    ``workers`` independent searches run on a process pool in rounds of
+    ``round_time`` seconds; after each round all of them restart from the
+    best plan found so far. ``solve`` returns that plan when ``time_limit``
+    runs out. FCFS ignores the maximum waiting times; repairs do not; a
+    group FCFS seated within its maximum wait stays within it, and one it
+    seated later can only move earlier.
+    """
+
+    def __init__(
+        self,
+        time_limit=10,
+        workers=None,
+        round_time=None,
+        destroy=0.3,
+        neighbourhoods=NEIGHBOURHOODS,
+        repairs=REPAIRS,
+        seed=None,
+        output_dir=".",
+        telemetry=None,
+    ):
+        self.time_limit = time_limit
+        self.workers = workers or os.cpu_count() or 1
+        self.round_time = round_time or max(time_limit / 5, 0.5)
+        self.destroy = destroy
+        self.neighbourhoods = tuple(neighbourhoods)
+        self.repairs = tuple(repairs)
+        self.seed = seed
+        self.output_dir = output_dir
+        self.telemetry = telemetry if telemetry is not None else Telemetry()
+        self.objective = None
+        self.schedule = None
+        self.rounds = 0
+
+    def solve(self, testcase):
+        started = time.perf_counter()
+        deadline = time.time() + self.time_limit
+        seeds = np.random.SeedSequence(self.seed)
+
+        with self.telemetry.phase("incumbent"):
+            # FCFS keeps its own telemetry, so the only result record is ours
+            allocation = FCFS().solve(testcase, report=False)
+            self.schedule = Schedule.from_allocation(allocation)
+            self.objective = Validator(testcase).objective(self.schedule)
+        initial = self.objective
+        print(f"FCFS objective: {initial}")
+
+        moves = {name: [0, 0] for name in self.neighbourhoods + self.repairs}
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while time.time() < deadline:
+                round_deadline = min(deadline, time.time() + self.round_time)
+                with self.telemetry.phase("round", round=self.rounds):
+                    futures = [
+                        pool.submit(
+                            _search,
+                            testcase,
+                            self.schedule,
+                            round_deadline,
+                            child,
+                            self.neighbourhoods,
+                            self.repairs,
+                            self.destroy,
+                        )
+                        for child in seeds.spawn(self.workers)
+                    ]
+                    results = [future.result() for future in futures]
+
+                improved = False
+                for value, schedule, stats in results:
+                    for name, (tried, kept) in stats.items():
+                        moves[name][0] += tried
+                        moves[name][1] += kept
+                    if value < self.objective - 1e-9:
+                        self.objective, self.schedule = value, schedule
+                        improved = True
+                self.rounds += 1
+                self.telemetry.emit(
+                    "lns_round",
+                    round=self.rounds,
+                    objective=self.objective,
+                    improved=improved,
+                    moves=sum(tried for tried, _ in moves.values()) // 2,
+                )
+                print(f"Round {self.rounds}: best {self.objective}")
+
+        self.runtime = time.perf_counter() - started
+        self.moves = moves
+        self.telemetry.emit("result", objective=self.objective, initial=initial)
+
+        with open(os.path.join(self.output_dir, "LNS.txt"), "w") as f:
+            f.write("Initial Objective Value: " + str(initial) + "\n")
+            f.write("Objective Value: " + str(self.objective) + "\n")
+            f.write("Rounds: " + str(self.rounds) + "\n")
+            for name, (tried, kept) in moves.items():
+                f.write(f"Moves ({name}): {kept} kept of {tried}\n")
+            f.write("Runtime: " + str(self.runtime) + "\n")
+        return self.schedule.to_solution()["a"]
+
+    def to_solution(self, testcase, sparse=False):
+        return as_solution(self.schedule, sparse)
+
+    def draw_solution(self, solution, formats=("png",)):
+        with self.telemetry.phase("draw"):
+            Renderer(self.output_dir, formats).draw_solution(solution, "LNS")
+
+
+def _search(testcase, schedule, deadline, seed, neighbourhoods, repairs, destroy):
+    """One worker's search until ``deadline``; return (objective, schedule, stats)."""
+    # A group may start no later than its maximum wait allows or, if FCFS
+    # already seated it later than that, than it starts now
+    latest = np.asarray(testcase.Ug) - np.asarray(testcase.Sg)
+    deadlines = np.maximum(latest, schedule.starts)
+    search = _Search(testcase, np.random.default_rng(seed), destroy, deadlines)
+    # Groups FCFS could not seat stay unseated
+    validator = Validator(testcase, ignore=("unseated",))
+    best = current = schedule
+    best_value = current_value = validator.objective(schedule)
+    stats = {name: [0, 0] for name in neighbourhoods + repairs}
+    while time.time() < deadline:
+        neighbourhood = neighbourhoods[search.rng.integers(len(neighbourhoods))]
+        repair = repairs[search.rng.integers(len(repairs))]
+        removed = search.destroy(current, neighbourhood)
+        if not removed:
+            continue
+        candidate = search.repair(current, removed, repair, deadline)
+        stats[neighbourhood][0] += 1
+        stats[repair][0] += 1
+        if candidate is None:
+            continue
+        # Repairs that break the plan are dropped, not kept
+        failed = validator.check(candidate)
+        late = failed.pop("wait", [])
+        if failed or np.any(candidate.starts[late] > deadlines[late]):
+            continue
+        value = validator.objective(candidate)
+        if value <= current_value + 1e-9:
+            if value < current_value - 1e-9:
+                stats[neighbourhood][1] += 1
+                stats[repair][1] += 1
+            current, current_value = candidate, value
+            if value < best_value - 1e-9:
+                best, best_value = candidate, value
+    search.close()
+    return best_value, best, stats
+
+
+class _Search:
+    """Destroy and repair moves of one LNS worker."""
+
+    def __init__(self, testcase, rng, destroy, deadlines):
+        self.testcase = testcase
+        self.rng = rng
+        self.deadlines = deadlines
+        self.combinations = TableCombinations(testcase.Md, testcase.Cij)
+        num_groups = len(testcase.Ng)
+        self.max_removed = max(2, math.ceil(destroy * num_groups))
+        self.cluster_size = max(2, math.ceil(destroy * len(testcase.Md)))
+        self.window = 2 * int(np.max(testcase.Pg))
+        self.max_columns = 1500  # keeps the sub-MIP small
+        self._env = None
+
+    def destroy(self, schedule, neighbourhood):
+        """Return the seated groups to remove from ``schedule``."""
+        starts = schedule.starts
+        seated = np.flatnonzero(starts >= 0)
+        if len(seated) == 0:
+            return []
+        if neighbourhood == "window":
+            t0 = starts[self.rng.choice(seated)] - self.rng.integers(self.window)
+            ends = starts + schedule.durations
+            removed = seated[(starts[seated] < t0 + self.window) & (ends[seated] > t0)]
+        elif neighbourhood == "tables":
+            cluster = {int(self.rng.integers(len(self.testcase.Md)))}
+            frontier = list(cluster)
+            while frontier and len(cluster) < self.cluster_size:
+                d = frontier.pop(int(self.rng.integers(len(frontier))))
+                for e in self.combinations.neighbors[d]:
+                    if e not in cluster and len(cluster) < self.cluster_size:
+                        cluster.add(e)
+                        frontier.append(e)
+            removed = [g for g in seated if cluster.intersection(schedule.tables[g])]
+        else:
+            # Groups that wait longest are the likeliest to gain
+            N = np.asarray(self.testcase.Ng)[seated]
+            weights = N * (starts[seated] + 1.0)
+            size = min(self.max_removed, len(seated))
+            removed = self.rng.choice(
+                seated, size=size, replace=False, p=weights / weights.sum()
+            )
+        removed = list(map(int, removed))
+        if len(removed) > self.max_removed:
+            removed = self.rng.choice(removed, self.max_removed, replace=False)
+        return sorted(map(int, removed))
+
+    def repair(self, schedule, removed, how, deadline):
+        """Seat the ``removed`` groups again; None if one of them no longer fits."""
+        testcase = self.testcase
+        occupancy = Occupancy.from_intervals(testcase.blocked, schedule.horizon)
+        kept = set(range(len(schedule))) - set(removed)
+        for g in kept:
+            if schedule.starts[g] >= 0:
+                occupancy.book(
+                    schedule.tables[g], schedule.starts[g], schedule.durations[g]
+                )
+
+        placed = self._greedy(occupancy.copy(), removed)
+        if placed is None:
+            return None
+        if how == "mip":
+            placed = self._mip(occupancy, removed, placed, deadline) or placed
+
+        starts = schedule.starts.copy()
+        tables = list(schedule.tables)
+        for g, (t, chosen) in placed.items():
+            starts[g] = t
+            tables[g] = list(chosen)
+        return Schedule(
+            starts, tables, schedule.durations, schedule.num_tables, schedule.horizon
+        )
+
+    def _greedy(self, occupancy, removed):
+        """Seat groups in random order at their cheapest start and table subset."""
+        N = self.testcase.Ng
+        P = self.testcase.Pg
+        H = self.testcase.Hg
+        alpha = self.testcase.alpha
+        placed = {}
+        for g in self.rng.permutation(removed):
+            best = None
+            for tables in self.combinations.feasible(N[g], H[g]):
+                t = occupancy.earliest_start(tables, P[g])
+                if t is None or t > self.deadlines[g]:
+                    continue
+                cost = N[g] * t + alpha * len(tables)
+                if best is None or cost < best[0]:
+                    best = (cost, t, tables)
+            if best is None:
+                return None
+            occupancy.book(best[2], best[1], P[g])
+            placed[int(g)] = best[1:]
+        return placed
+
+    def _mip(self, occupancy, removed, placed, deadline):
+        """Re-seat groups optimally, each by its deadline and the greedy plan's last start."""
+        N = self.testcase.Ng
+        P = self.testcase.Pg
+        alpha = self.testcase.alpha
+        latest = max(t for t, _ in placed.values())
+        columns = []
+        for g in removed:
+            for tables in self.combinations.feasible(N[g], self.testcase.Hg[g]):
+                for t in range(min(latest, self.deadlines[g]) + 1):
+                    if occupancy.is_free(tables, t, P[g]):
+                        columns.append((g, tables, t))
+            if len(columns) > self.max_columns:
+                return None
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return None
+
+        model = gp.Model("lns_repair", env=self._gurobi())
+        model.params.TimeLimit = remaining
+        z = model.addVars(
+            len(columns),
+            vtype=GRB.BINARY,
+            obj=[N[g] * t + alpha * len(tables) for g, tables, t in columns],
+        )
+        by_group = {}
+        cells = {}
+        for i, (g, tables, t) in enumerate(columns):
+            by_group.setdefault(g, []).append(i)
+            z[i].Start = float(placed[g] == (t, tables))
+            for d in tables:
+                for period in range(t, t + P[g]):
+                    cells.setdefault((d, period), []).append(i)
+        model.addConstrs(gp.quicksum(z[i] for i in by_group[g]) == 1 for g in removed)
+        model.addConstrs(
+            gp.quicksum(z[i] for i in cells[cell]) <= 1
+            for cell in cells
+            if len(cells[cell]) > 1
+        )
+        model.optimize()
+        result = None
+        if model.SolCount > 0:
+            result = {
+                g: (t, tables)
+                for i, (g, tables, t) in enumerate(columns)
+                if z[i].X > 0.5
+            }
+        model.dispose()
+        return result
+
+    def _gurobi(self):
+        if self._env is None:
+            self._env = gp.Env(empty=True)
+            self._env.setParam("OutputFlag", 0)
+            self._env.setParam("Threads", 1)
+            self._env.start()
+        return self._env
+
+    def close(self):
+        if self._env is not None:
+            self._env.dispose()
+
+
+if __name__ == "__main__":
+    telemetry = Telemetry("telemetry.jsonl")
+    with telemetry.phase("load"):
+        testcase = Testcase.from_csv("testcase_data.csv")
+    lns = LNS(telemetry=telemetry)
+    lns.solve(testcase)
+    solution = lns.to_solution(testcase)
+    if solution:
+        lns.draw_solution(solution)
+    telemetry.close()
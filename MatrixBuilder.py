@@ -0,0 +1,328 @@
+import gurobipy as gp
+from gurobipy import GRB
+import numpy as np
+import scipy.sparse as sp
+
+from Telemetry import Telemetry
+
+
+def _matrix(rows, cols, vals, shape):
+    # Duplicate (row, col) entries are summed
+    return sp.csr_matrix((vals, (rows, cols)), shape=shape)
+
+
+class MatrixBuilder:
+    """Build the Solver model families as sparse blocks through the matrix API.
+
+    Mirrors ``Solver._build_*``: every family keeps its name and meaning, but
+    its coefficients are assembled with NumPy index arithmetic and added with
+    a single ``addConstr`` on ``MVar`` objects instead of one ``LinExpr`` per
+    row. The returned ``tupledict`` views hold the same keys as the quicksum
+    builder, so ``Solver.to_solution`` works unchanged.
+    """
+
+    def __init__(self, model, testcase, horizon, telemetry=None):
+        self.model = model
+        self.telemetry = telemetry if telemetry is not None else Telemetry()
+        self.testcase = testcase
+        self.horizon = horizon
+        self.num_groups = int(len(testcase.Ng))
+        self.num_tables = int(len(testcase.Md))
+
+    def _add_vars(self, keys, name, obj=0.0):
+        with self.telemetry.phase("variables", family=name):
+            names = [f"{name}[{','.join(map(str, key))}]" for key in keys]
+            var = self.model.addMVar(len(keys), vtype=GRB.BINARY, obj=obj, name=names)
+            return var, gp.tupledict(zip(keys, var.tolist()))
+
+    def _add(self, lhs, sense, rhs, name):
+        if lhs.shape[0] == 0:
+            return
+        with self.telemetry.phase("constraints", family=name):
+            if sense == "<":
+                self.model.addConstr(lhs <= rhs, name=name)
+            elif sense == ">":
+                self.model.addConstr(lhs >= rhs, name=name)
+            else:
+                self.model.addConstr(lhs == rhs, name=name)
+
+    def table_choice(self, starts, pairs=True):
+        """Table choice b, start x and, with ``pairs``, the combination c."""
+        N = np.asarray(self.testcase.Ng)
+        M = np.asarray(self.testcase.Md)
+        C = np.asarray(self.testcase.Cij)
+        S = np.asarray(self.testcase.Sg)
+        H = np.asarray(self.testcase.Hg)
+        alpha = self.testcase.alpha
+        G = self.num_groups
+        D = self.num_tables
+
+        x_keys = [(g, t) for g in range(G) for t in starts[g]]
+        self.xg = np.array([g for g, _ in x_keys], dtype=int)
+        self.xt = np.array([t for _, t in x_keys], dtype=int)
+        self.xpos = -np.ones((G, self.horizon), dtype=int)
+        self.xpos[self.xg, self.xt] = np.arange(len(x_keys))
+        num_x = len(x_keys)
+
+        b_keys = [(g, d) for g in range(G) for d in range(D)]
+        self.b, b = self._add_vars(b_keys, "b")
+        self.c, c = None, None
+        if pairs:
+            c_keys = [(g, i, j) for g in range(G) for i in range(D) for j in range(D)]
+            self.c, c = self._add_vars(c_keys, "c")
+        self.x, x = self._add_vars(x_keys, "x")
+
+        # Objective function
+        constant = float(np.sum(N * S) - alpha * np.sum(H))
+        self.model.setObjective(
+            (N[self.xg] * self.xt) @ self.x + np.full(G * D, alpha) @ self.b + constant,
+            GRB.MINIMIZE,
+        )
+
+        # Constraints
+        per_group = sp.kron(sp.eye(G), np.ones((1, D)), format="csr")
+        self._add(
+            sp.kron(sp.eye(G), M[None, :], format="csr") @ self.b,
+            ">",
+            N,
+            "seating_capacity",
+        )
+
+        if pairs:
+            rows = np.arange(G * D * D)
+            gi, ii, jj = np.unravel_index(rows, (G, D, D))
+            both = _matrix(
+                np.concatenate([rows, rows]),
+                np.concatenate([gi * D + ii, gi * D + jj]),
+                np.ones(2 * len(rows)),
+                (len(rows), G * D),
+            )
+            self._add(
+                2 * self.c - both @ self.b,
+                "<",
+                np.zeros(len(rows)),
+                "table_combination_2",
+            )
+
+            adjacent = sp.kron(sp.eye(G), np.triu(C, 1).reshape(1, -1), format="csr")
+            self._add(
+                adjacent @ self.c - per_group @ self.b,
+                ">",
+                -np.ones(G),
+                "table_combination_3",
+            )
+        self._add(per_group @ self.b, "<", H, "max_tables")
+
+        single = _matrix(self.xg, np.arange(num_x), np.ones(num_x), (G, num_x))
+        self._add(single @ self.x, "=", np.ones(G), "single_start")
+        return b, c, x
+
+    def assignment(self, cells):
+        P = np.asarray(self.testcase.Pg)
+        G = self.num_groups
+        D = self.num_tables
+        T = self.horizon
+        num_x = len(self.xg)
+
+        a_keys = [(g, d, t) for (g, d), ts in cells.items() for t in ts]
+        num_a = len(a_keys)
+        keys = np.array(a_keys, dtype=int).reshape(-1, 3)
+        ag, ad, at = keys[:, 0], keys[:, 1], keys[:, 2]
+        self.a, a = self._add_vars(a_keys, "a")
+
+        # idx[g, d, t]: position of a[g,d,t], -1 where the cell does not exist
+        idx = -np.ones((G, D, T + int(P.max()) + 1), dtype=int)
+        idx[ag, ad, at] = np.arange(num_a)
+        identity = sp.identity(num_a, format="csr")
+        a_to_b = _matrix(np.arange(num_a), ag * D + ad, np.ones(num_a), (num_a, G * D))
+
+        self._add(
+            identity @ self.a - a_to_b @ self.b,
+            "<",
+            np.zeros(num_a),
+            "assignment_match",
+        )
+        self._add(
+            a_to_b.T.tocsr() @ self.a
+            - sp.diags(np.repeat(P, D).astype(float)) @ self.b,
+            "=",
+            np.zeros(G * D),
+            "meal_duration",
+        )
+
+        # One row per (x key, table)
+        num_rows = num_x * D
+        row_g = np.repeat(self.xg, D)
+        row_t = np.repeat(self.xt, D)
+        row_d = np.tile(np.arange(D), num_x)
+        row_x = np.repeat(np.arange(num_x), D)
+        row_b = row_g * D + row_d
+
+        rows, cols = [], []
+        for k in range(int(P.max())):
+            col = idx[row_g, row_d, row_t + k]
+            mask = (k < P[row_g]) & (col >= 0)
+            rows.append(np.flatnonzero(mask))
+            cols.append(col[mask])
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        window = _matrix(rows, cols, np.ones(len(rows)), (num_rows, num_a))
+        to_b = _matrix(np.arange(num_rows), row_b, np.ones(num_rows), (num_rows, G * D))
+        to_x = _matrix(
+            np.arange(num_rows), row_x, P[row_g].astype(float), (num_rows, num_x)
+        )
+        self._add(
+            window @ self.a - 9999 * to_b @ self.b - to_x @ self.x,
+            ">",
+            np.full(num_rows, -9999.0),
+            "continuous_assignment",
+        )
+
+        def cell_matrix(select, t):
+            col = idx[row_g[select], row_d[select], t]
+            mask = col >= 0
+            return _matrix(
+                np.flatnonzero(mask),
+                col[mask],
+                np.ones(mask.sum()),
+                (select.sum(), num_a),
+            )
+
+        first = row_t == 0
+        later = row_t > 0
+        n0, n1 = int(first.sum()), int(later.sum())
+        self._add(
+            _matrix(np.arange(n0), row_x[first], np.ones(n0), (n0, num_x)) @ self.x
+            - cell_matrix(first, row_t[first]) @ self.a
+            + _matrix(np.arange(n0), row_b[first], np.ones(n0), (n0, G * D)) @ self.b,
+            "<",
+            np.ones(n0),
+            "start_time_0",
+        )
+        self._add(
+            _matrix(np.arange(n1), row_x[later], np.full(n1, 2.0), (n1, num_x)) @ self.x
+            - cell_matrix(later, row_t[later]) @ self.a
+            + cell_matrix(later, row_t[later] - 1) @ self.a
+            + _matrix(np.arange(n1), row_b[later], np.full(n1, 2.0), (n1, G * D))
+            @ self.b,
+            "<",
+            np.full(n1, 3.0),
+            "start_time",
+        )
+
+        # max_wait and table_unavailability are implied by the windows
+        self._single_assignment(ad * T + at, np.arange(num_a), self.a)
+        return a
+
+    def _single_assignment(self, cell, var_index, var):
+        counts = np.bincount(cell, minlength=1)
+        mask = counts[cell] > 1
+        _, rows = np.unique(cell[mask], return_inverse=True)
+        num_rows = int(rows.max()) + 1 if len(rows) else 0
+        shared = _matrix(
+            rows, var_index[mask], np.ones(len(rows)), (num_rows, var.shape[0])
+        )
+        self._add(shared @ var, "<", np.ones(num_rows), "single_assignment")
+
+    def start(self, table_starts):
+        N = np.asarray(self.testcase.Ng)
+        M = np.asarray(self.testcase.Md)
+        P = np.asarray(self.testcase.Pg)
+        H = np.asarray(self.testcase.Hg)
+        D = self.num_tables
+        T = self.horizon
+        num_x = len(self.xg)
+
+        y_keys = [(g, d, s) for (g, d), ss in table_starts.items() for s in ss]
+        num_y = len(y_keys)
+        keys = np.array(y_keys, dtype=int).reshape(-1, 3)
+        yg, yd, ys = keys[:, 0], keys[:, 1], keys[:, 2]
+        self.y, y = self._add_vars(y_keys, "y")
+        y_rows = np.arange(num_y)
+        y_x = self.xpos[yg, ys]
+
+        self._add(
+            sp.identity(num_y, format="csr") @ self.y
+            - _matrix(y_rows, y_x, np.ones(num_y), (num_y, num_x)) @ self.x,
+            "<",
+            np.zeros(num_y),
+            "start_together",
+        )
+
+        pairs = list(table_starts)
+        pair_row = -np.ones(self.num_groups * D, dtype=int)
+        pair_row[[g * D + d for g, d in pairs]] = np.arange(len(pairs))
+        pair_b = np.array([g * D + d for g, d in pairs], dtype=int)
+        self._add(
+            _matrix(pair_row[yg * D + yd], y_rows, np.ones(num_y), (len(pairs), num_y))
+            @ self.y
+            - _matrix(
+                np.arange(len(pairs)),
+                pair_b,
+                np.ones(len(pairs)),
+                (len(pairs), self.num_groups * D),
+            )
+            @ self.b,
+            "=",
+            np.zeros(len(pairs)),
+            "table_use",
+        )
+
+        x_rows = np.arange(num_x)
+        self._add(
+            _matrix(y_x, y_rows, M[yd].astype(float), (num_x, num_y)) @ self.y
+            - sp.diags(N[self.xg].astype(float)) @ self.x,
+            ">",
+            np.zeros(num_x),
+            "start_capacity",
+        )
+        self._add(
+            _matrix(y_x, y_rows, np.ones(num_y), (num_x, num_y)) @ self.y
+            - _matrix(x_rows, x_rows, H[self.xg].astype(float), (num_x, num_x))
+            @ self.x,
+            "<",
+            np.zeros(num_x),
+            "start_max_tables",
+        )
+
+        # Expand every start over the periods it occupies
+        length = P[yg]
+        entry = np.repeat(y_rows, length)
+        offset = np.arange(len(entry)) - np.repeat(np.cumsum(length) - length, length)
+        cell = yd[entry] * (T + 1) + ys[entry] + offset
+        self._single_assignment(cell, entry, self.y)
+        return y
+
+    def column(self, columns, z_keys, cost):
+        P = np.asarray(self.testcase.Pg)
+        T = self.horizon
+
+        keys = np.array(z_keys, dtype=int).reshape(-1, 3)
+        zg, zs = keys[:, 0], keys[:, 2]
+        num_z = len(z_keys)
+        self.z, z = self._add_vars(
+            z_keys, "z", obj=np.array([cost[key] for key in z_keys])
+        )
+        self.model.ModelSense = GRB.MINIMIZE
+
+        self._add(
+            _matrix(zg, np.arange(num_z), np.ones(num_z), (self.num_groups, num_z))
+            @ self.z,
+            "=",
+            np.ones(self.num_groups),
+            "single_column",
+        )
+
+        # (column, table) pairs, then expanded over the meal periods
+        tables = [columns[g][k] for g, k, _ in z_keys]
+        width = np.array([len(ts) for ts in tables], dtype=int)
+        pair = np.repeat(np.arange(num_z), width)
+        pair_d = np.array([d for ts in tables for d in ts], dtype=int)
+        length = P[zg[pair]]
+        entry = np.repeat(np.arange(len(pair)), length)
+        offset = np.arange(len(entry)) - np.repeat(np.cumsum(length) - length, length)
+        cell = pair_d[entry] * (T + 1) + zs[pair[entry]] + offset
+        _, rows = np.unique(cell, return_inverse=True)
+        num_rows = int(rows.max()) + 1 if len(rows) else 0
+        capacity = _matrix(rows, pair[entry], np.ones(len(rows)), (num_rows, num_z))
+        self._add(capacity @ self.z, "<", np.ones(num_rows), "table_capacity")
+        return z
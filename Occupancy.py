@@ -0,0 +1,93 @@
+import numpy as np
+
+
+class Occupancy:
+    """Table occupancy stored as one integer bitmask per table.
+
+    Bit ``t`` of ``masks[d]`` is set when table ``d`` is occupied in period
+    ``t``, so checking or booking a table for ``[t, t + p)`` is a single
+    shift-and-mask on Python integers instead of a slice scan. Periods past
+    ``horizon`` are treated as occupied.
+    """
+
+    def __init__(self, masks, horizon):
+        self.masks = list(masks)
+        self.horizon = int(horizon)
+
+    @staticmethod
+    def from_array(Odt):
+        """Copy a dense tables x periods 0/1 matrix into bitmasks."""
+        O = np.asarray(Odt) == 1
+        packed = np.packbits(O, axis=1, bitorder="little")
+        masks = [int.from_bytes(row.tobytes(), "little") for row in packed]
+        return Occupancy(masks, O.shape[1])
+
+    @staticmethod
+    def from_intervals(blocked, horizon):
+        """Build bitmasks from per-table lists of blocked ``(start, end)`` intervals."""
+        masks = []
+        for intervals in blocked:
+            mask = 0
+            for start, end in intervals:
+                mask |= ((1 << int(end - start)) - 1) << int(start)
+            masks.append(mask)
+        return Occupancy(masks, horizon)
+
+    def copy(self):
+        return Occupancy(self.masks, self.horizon)
+
+    def is_free(self, tables, start, duration):
+        """Return True if every table in ``tables`` is free during ``[start, start + duration)``."""
+        if start + duration > self.horizon:
+            return False
+        span = ((1 << int(duration)) - 1) << int(start)
+        return all(self.masks[d] & span == 0 for d in tables)
+
+    def earliest_start(self, tables, duration, after=0):
+        """Return the first ``t >= after`` at which ``tables`` are free for ``duration`` periods, or None."""
+        occupied = 0
+        for d in tables:
+            occupied |= self.masks[d]
+        free = ~occupied & ((1 << self.horizon) - 1)
+        # Bit t survives only if bits t .. t + duration - 1 are all free
+        starts = free
+        for k in range(1, int(duration)):
+            starts &= free >> k
+        starts >>= int(after)
+        if starts == 0:
+            return None
+        return (starts & -starts).bit_length() - 1 + int(after)
+
+    def book(self, tables, start, duration):
+        span = ((1 << int(duration)) - 1) << int(start)
+        for d in tables:
+            self.masks[d] |= span
+
+    def to_array(self):
+        """Return the dense tables x periods 0/1 matrix."""
+        num_bytes = (self.horizon + 7) // 8
+        window = (1 << self.horizon) - 1
+        packed = np.array(
+            [
+                list((mask & window).to_bytes(num_bytes, "little"))
+                for mask in self.masks
+            ],
+            dtype=np.uint8,
+        ).reshape(len(self.masks), num_bytes)
+        bits = np.unpackbits(packed, axis=1, count=self.horizon, bitorder="little")
+        return bits.astype(int)
+
+    def to_intervals(self):
+        """Return the occupied ``(start, end)`` intervals of each table."""
+        blocked = []
+        for mask in self.masks:
+            mask &= (1 << self.horizon) - 1
+            intervals = []
+            while mask:
+                start = (mask & -mask).bit_length() - 1
+                # Adding the lowest bit carries through the run of ones
+                end = ((mask + (1 << start)) & ~mask).bit_length() - 1
+                intervals.append((start, end))
+                mask &= ~((1 << end) - 1)
+            blocked.append(intervals)
+        return blocked
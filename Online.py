@@ -0,0 +1,256 @@
+import time
+
+import gurobipy as gp
+from gurobipy import GRB
+import numpy as np
+
+from Combinations import TableCombinations
+from Occupancy import Occupancy
+from Testcase import Testcase
+
+
+class OnlineSolver:
+    """Rolling-horizon re-optimization for a queue that changes over time.
+
+    Keeps one column model (see ``Solver(mode="column")``) alive across
+    events. Times are absolute periods. ``add_group`` adds the columns of a
+    newly arrived group, ``block`` records table unavailability, ``advance``
+    moves the clock, seating every group whose planned start has passed and
+    dropping groups that have finished, and ``optimize`` re-solves starting
+    from the previous plan.
+
+    A group that cannot be seated within its maximum wait takes the
+    ``unseated`` column at cost ``reject_cost`` per person instead of making
+    the whole model infeasible.
+    """
+
+    def __init__(self, Md, Cij, alpha, now=0, reject_cost=1000, threads=None):
+        self.Md = np.asarray(Md)
+        self.alpha = alpha
+        self.now = int(now)
+        self.reject_cost = reject_cost
+        self.combinations = TableCombinations(Md, Cij)
+        self.blocked = Occupancy([0] * len(self.Md), 0)
+
+        self.model = gp.Model("online_seating")
+        self.model.params.OutputFlag = 0
+        if threads is not None:
+            self.model.params.Threads = threads
+        self.model.ModelSense = GRB.MINIMIZE
+
+        self.groups = {}
+        self.z = {}
+        self.unseated = {}
+        self.single_column = {}
+        self.cells = {}
+        self.rows = {}
+        self.dirty = set()
+        self.plan = {}
+        self.seated = {}
+        self.finished = {}
+        self.rejected = {}
+        self.next_id = 0
+
+    def add_group(self, N, P, U, H, S=0):
+        """Add a group that has already waited ``S`` periods; return its id."""
+        g = self.next_id
+        self.next_id += 1
+        arrival = self.now - int(S)
+        self.groups[g] = {
+            "N": int(N),
+            "P": int(P),
+            "U": int(U),
+            "H": int(H),
+            "arrival": arrival,
+        }
+        latest = arrival + int(U)
+        self.blocked.horizon = max(self.blocked.horizon, latest + int(P))
+
+        columns = self.combinations.feasible(N, H)
+        self.groups[g]["columns"] = columns
+        added = []
+        for k, tables in enumerate(columns):
+            s = self.now
+            while s <= latest:
+                s = self.blocked.earliest_start(tables, P, after=s)
+                if s is None or s > latest:
+                    break
+                cost = N * (s - arrival) - self.alpha * (H - len(tables))
+                var = self.model.addVar(
+                    vtype=GRB.BINARY, obj=cost, name=f"z[{g},{k},{s}]"
+                )
+                self.z[g, k, s] = var
+                added.append(var)
+                for d in tables:
+                    for t in range(s, s + int(P)):
+                        self.cells.setdefault((d, t), []).append((g, k, s))
+                        self.dirty.add((d, t))
+                s += 1
+
+        self.unseated[g] = self.model.addVar(
+            vtype=GRB.BINARY, obj=self.reject_cost * N, name=f"unseated[{g}]"
+        )
+        self.single_column[g] = self.model.addConstr(
+            gp.quicksum(added) + self.unseated[g] == 1,
+            name=f"single_column[{g}]",
+        )
+        return g
+
+    def _drop(self, keys):
+        for key in keys:
+            g, k, s = key
+            tables = self.groups[g]["columns"][k]
+            for d in tables:
+                for t in range(s, s + self.groups[g]["P"]):
+                    # Cells in the past have already been discarded
+                    if (d, t) in self.cells:
+                        self.cells[d, t].remove(key)
+                        self.dirty.add((d, t))
+            self.model.remove(self.z.pop(key))
+            if self.plan.get(g) == (k, s):
+                del self.plan[g]
+
+    def block(self, d, start, end):
+        """Mark table ``d`` unavailable during ``[start, end)``."""
+        self.blocked.horizon = max(self.blocked.horizon, end)
+        self.blocked.book([d], start, end - start)
+        hit = [
+            key
+            for t in range(start, end)
+            for key in self.cells.get((d, t), [])
+            if key[0] not in self.seated
+        ]
+        self._drop(set(hit))
+
+    def commit(self, g):
+        """Fix group ``g`` to its current planned column."""
+        k, s = self.plan[g]
+        self.seated[g] = (s, self.groups[g]["columns"][k])
+        self.z[g, k, s].LB = 1
+        self._drop([key for key in self.z if key[0] == g and key != (g, k, s)])
+        self.model.remove(self.unseated.pop(g))
+
+    def advance(self, now):
+        """Move the clock to ``now``.
+
+        Groups whose planned start is already in the past are seated as
+        planned; columns that would start in the past are removed; waiting
+        groups left without any column are rejected, and groups whose meal
+        has ended are dropped from the model.
+        """
+        self.now = int(now)
+        for g, (_, s) in list(self.plan.items()):
+            if g not in self.seated and s < self.now:
+                self.commit(g)
+
+        stale = [
+            key for key in self.z if key[0] not in self.seated and key[2] < self.now
+        ]
+        self._drop(stale)
+
+        # Waiting groups with no start left in their window are turned away
+        alive = {key[0] for key in self.z}
+        for g in [g for g in self.unseated if g not in alive]:
+            self.rejected[g] = self.groups[g]
+            self.model.remove(self.unseated.pop(g))
+            self.model.remove(self.single_column.pop(g))
+
+        for g, (s, _) in list(self.seated.items()):
+            if s + self.groups[g]["P"] <= self.now:
+                self.finished[g] = self.seated.pop(g)
+                self._drop([key for key in self.z if key[0] == g])
+                self.model.remove(self.single_column.pop(g))
+                self.plan.pop(g, None)
+
+        for cell in [cell for cell in self.cells if cell[1] < self.now]:
+            if cell in self.rows:
+                self.model.remove(self.rows.pop(cell))
+            self.dirty.discard(cell)
+            del self.cells[cell]
+
+    def optimize(self):
+        """Re-solve from the previous plan and return ``{group: (start, tables)}``."""
+        started = time.perf_counter()
+        for cell in self.dirty:
+            if cell in self.rows:
+                self.model.remove(self.rows.pop(cell))
+            keys = self.cells.get(cell, [])
+            if len(keys) > 1:
+                self.rows[cell] = self.model.addConstr(
+                    gp.quicksum(self.z[key] for key in keys) <= 1,
+                    name=f"table_capacity[{cell[0]},{cell[1]}]",
+                )
+        self.dirty.clear()
+
+        # Previous decisions seed the new search; new groups stay undefined
+        for (g, k, s), var in self.z.items():
+            if g in self.plan:
+                var.Start = 1.0 if self.plan[g] == (k, s) else 0.0
+        for g, var in self.unseated.items():
+            if g in self.plan:
+                var.Start = 0.0
+
+        self.model.optimize()
+        self.plan = {}
+        if self.model.SolCount > 0:
+            values = self.model.getAttr("X", self.z)
+            for (g, k, s), value in values.items():
+                if value > 0.5:
+                    self.plan[g] = (k, s)
+        self.elapsed = time.perf_counter() - started
+        return {g: (s, self.groups[g]["columns"][k]) for g, (k, s) in self.plan.items()}
+
+    def to_testcase(self):
+        """Snapshot of the groups still waiting, relative to ``now``.
+
+        ``Sg`` is the time each group has waited so far and the blocked
+        intervals hold both blocked periods and tables held by seated groups.
+        """
+        waiting = list(self.unseated)
+        occupancy = self.blocked.copy()
+        for g, (s, tables) in self.seated.items():
+            occupancy.book(tables, s, self.groups[g]["P"])
+        # Shift to times relative to now, dropping what is already over
+        blocked = [
+            [
+                (max(start, self.now) - self.now, end - self.now)
+                for start, end in row
+                if end > self.now
+            ]
+            for row in occupancy.to_intervals()
+        ]
+        info = [self.groups[g] for g in waiting]
+        return Testcase(
+            np.array([i["N"] for i in info]),
+            self.Md,
+            self.combinations.Cij,
+            np.array([i["P"] for i in info]),
+            np.array([i["U"] for i in info]),
+            np.array([self.now - i["arrival"] for i in info]),
+            np.array([i["H"] for i in info]),
+            None,
+            self.alpha,
+            blocked=blocked,
+            horizon=max(occupancy.horizon - self.now, 0),
+        )
+
+
+if __name__ == "__main__":
+    # Replay a stored testcase as a stream: one arrival per period
+    testcase = Testcase.from_csv("testcase_data.csv")
+    online = OnlineSolver(testcase.Md, testcase.Cij, testcase.alpha)
+    for d, intervals in enumerate(testcase.blocked):
+        for start, end in intervals:
+            online.block(d, start, end)
+
+    for g in range(len(testcase.Ng)):
+        online.advance(g)
+        online.add_group(
+            testcase.Ng[g],
+            testcase.Pg[g],
+            testcase.Ug[g],
+            testcase.Hg[g],
+            testcase.Sg[g],
+        )
+        plan = online.optimize()
+        print(f"t={online.now:3d} plan={plan} ({online.elapsed * 1000:.1f} ms)")
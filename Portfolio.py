@@ -0,0 +1,284 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from Renderer import Renderer
+from Schedule import as_solution
+from Solver import Solver
+from Telemetry import Telemetry
+from Testcase import Testcase
+
+# Parameter sets raced by default; Solver.DEFAULT_PARAMS is the first one
+CONFIGS = [
+    {"MIPFocus": 3},
+    {"MIPFocus": 1, "Heuristics": 0.5},
+    {"MIPFocus": 2, "Cuts": 2},
+    {"MIPFocus": 0, "Cuts": 0, "Seed": 1},
+    {"MIPFocus": 3, "Presolve": 2, "Seed": 2},
+    {"MIPFocus": 1, "NoRelHeurTime": 5, "Seed": 3},
+]
+
+TUNED = "tuned_params.json"
+
+
+class Portfolio:
+    """Race several Gurobi parameter sets on one instance and keep the best result."""
+
+    def __init__(
+        self,
+        configs=CONFIGS,
+        mode="column",
+        time_limit=60,
+        threads=None,
+        output_dir=".",
+        telemetry=None,
+    ):
+        self.configs = [dict(config) for config in configs]
+        self.mode = mode
+        self.time_limit = time_limit
+        self.threads = threads or os.cpu_count() or 1
+        self.output_dir = output_dir
+        self.telemetry = telemetry if telemetry is not None else Telemetry()
+        self.runs = []
+        self.best = None
+        self.status = None
+        self.objective = None
+        self.bound = None
+        self.gap = None
+
+    def solve(self, testcase):
+        self.runs = []
+        self.best = self.status = None
+        self.objective = self.bound = self.gap = None
+        threads = max(1, self.threads // len(self.configs))
+        with multiprocessing.Manager() as manager, ProcessPoolExecutor(
+            max_workers=len(self.configs)
+        ) as pool:
+            stop = manager.Event()
+            futures = [
+                pool.submit(
+                    _race,
+                    testcase,
+                    self.mode,
+                    {"Threads": threads, **config},
+                    self.time_limit,
+                    stop,
+                )
+                for config in self.configs
+            ]
+            for future in as_completed(futures):
+                run = future.result()
+                self.runs.append(run)
+                self.telemetry.emit("portfolio_run", **_summary(run))
+                print(
+                    f"{run['params']}: {run['status']} {run['objective']} "
+                    f"({run['runtime']:.2f}s)"
+                )
+
+        solved = [run for run in self.runs if run["objective"] is not None]
+        bounds = [run["bound"] for run in self.runs if run["bound"] is not None]
+        if solved:
+            self.best = min(
+                solved, key=lambda run: (run["status"] != "OPTIMAL", run["objective"])
+            )
+            self.objective = self.best["objective"]
+            self.status = self.best["status"]
+        elif self.runs:
+            self.status = self.runs[0]["status"]
+        if bounds:
+            self.bound = max(bounds)
+        if self.objective is not None and self.bound is not None:
+            self.gap = max(0.0, self.objective - self.bound) / max(
+                abs(self.objective), 1e-10
+            )
+        self.telemetry.emit(
+            "result", status=self.status, objective=self.objective, gap=self.gap
+        )
+
+        with open(os.path.join(self.output_dir, "portfolio.txt"), "w") as f:
+            f.write("Objective Value: " + str(self.objective) + "\n")
+            f.write("Bound: " + str(self.bound) + "\n")
+            f.write("Gap: " + str(self.gap) + "\n")
+            if self.best is not None:
+                f.write("Winner: " + json.dumps(self.best["params"]) + "\n")
+            for run in self.runs:
+                f.write(
+                    f"Run {json.dumps(run['params'])}: {run['status']} "
+                    f"{run['objective']} {run['runtime']:.2f}s\n"
+                )
+
+    def report(self):
+        if self.status == "OPTIMAL":
+            print(f"Optimal solution found by {self.best['params']}")
+        else:
+            print("No optimal solution found")
+
+    def to_solution(self, testcase, sparse=False):
+        return as_solution(self.best and self.best["schedule"], sparse)
+
+    def draw_solution(self, solution, formats=("png",)):
+        with self.telemetry.phase("draw"):
+            Renderer(self.output_dir, formats).draw_solution(solution, "portfolio")
+
+
+def _race(testcase, mode, params, time_limit, stop):
+    """Solve with one parameter set; set ``stop``, if any, once optimality is proved."""
+    started = time.perf_counter()
+    run = {"params": params, "status": None, "objective": None, "bound": None}
+    run["schedule"] = None
+    if stop is not None and stop.is_set():
+        run.update(status="STOPPED", runtime=0.0)
+        return run
+    with tempfile.TemporaryDirectory() as out, contextlib.redirect_stdout(
+        io.StringIO()
+    ):
+        try:
+            solver = Solver(
+                mode=mode,
+                time_limit=time_limit,
+                output_dir=out,
+                params=params,
+                stop=stop,
+            )
+            solver.solve(testcase)
+            run.update(status=solver.status, objective=solver.objective)
+            if solver.model.IsMIP and solver.model.SolCount > 0:
+                run["bound"] = solver.model.ObjBound
+            if solver.objective is not None:
+                run["schedule"] = solver.to_solution(testcase, sparse=True)
+            if solver.status == "OPTIMAL" and stop is not None:
+                stop.set()
+        except Exception as e:
+            run.update(status="error", error=repr(e))
+    run["runtime"] = time.perf_counter() - started
+    return run
+
+
+def _summary(run):
+    return {key: value for key, value in run.items() if key != "schedule"}
+
+
+def _score(run, time_limit):
+    """PAR-2 score: runtime if solved to optimality, twice the limit otherwise."""
+    return run["runtime"] if run["status"] == "OPTIMAL" else 2 * time_limit
+
+
+def tune(
+    roots=("dapu", "hantiange"),
+    configs=CONFIGS,
+    mode="column",
+    time_limit=60,
+    threads=1,
+    workers=None,
+    output=TUNED,
+):
+    """Run every configuration on every stored instance; save the best per family.
+
+    The family of an instance is the top-level directory it was found in.
+    Runs are independent (no shared stop event) so their runtimes can be
+    compared; the configuration with the lowest total PAR-2 score wins.
+    Returns ``{family: {"params": ..., "score": ..., "scores": [...]}}``.
+    """
+    jobs = [
+        (Path(root).name, path, i)
+        for root in roots
+        for path in sorted(Path(root).rglob("testcase*.csv"))
+        for i in range(len(configs))
+    ]
+    print(f"{len(jobs)} runs, {time_limit}s limit each")
+
+    scores = {}
+    testcases = {}
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as pool:
+        futures = {}
+        for family, path, i in jobs:
+            if path not in testcases:
+                testcases[path] = Testcase.from_csv(path)
+            params = {"Threads": threads, **configs[i]}
+            future = pool.submit(_race, testcases[path], mode, params, time_limit, None)
+            futures[future] = (family, path, i)
+        for future in as_completed(futures):
+            family, path, i = futures[future]
+            run = future.result()
+            score = _score(run, time_limit)
+            scores.setdefault(family, {}).setdefault(i, []).append(score)
+            print(f"{str(path):45s} {configs[i]} {run['status']} {score:.2f}")
+
+    tuned = {}
+    for family, by_config in scores.items():
+        totals = {i: sum(values) for i, values in by_config.items()}
+        best = min(totals, key=totals.get)
+        tuned[family] = {
+            "params": configs[best],
+            "score": totals[best],
+            "scores": [
+                {"params": configs[i], "score": total}
+                for i, total in sorted(totals.items())
+            ],
+        }
+    with open(output, "w") as f:
+        json.dump(tuned, f, indent=2)
+    return tuned
+
+
+def load_params(family, filename=TUNED):
+    """Return the tuned parameters of ``family``, or None if it was never tuned."""
+    if not os.path.exists(filename):
+        return None
+    with open(filename) as f:
+        return json.load(f).get(family, {}).get("params")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Race Gurobi parameter sets, or tune them on stored testcases"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    solve = commands.add_parser("solve", help="race the portfolio on one testcase")
+    solve.add_argument("testcase", nargs="?", default="testcase_data.csv")
+    solve.add_argument("--time-limit", type=float, default=60)
+    solve.add_argument("--threads", type=int, default=None)
+    solve.add_argument("--mode", choices=Solver.MODES, default="column")
+    tuning = commands.add_parser("tune", help="pick the best parameters per family")
+    tuning.add_argument("roots", nargs="*", default=["dapu", "hantiange"])
+    tuning.add_argument("--time-limit", type=float, default=60)
+    tuning.add_argument("--threads", type=int, default=1)
+    tuning.add_argument("--workers", type=int, default=None)
+    tuning.add_argument("--mode", choices=Solver.MODES, default="column")
+    tuning.add_argument("--output", default=TUNED)
+    args = parser.parse_args()
+
+    if args.command == "tune":
+        tuned = tune(
+            args.roots,
+            mode=args.mode,
+            time_limit=args.time_limit,
+            threads=args.threads,
+            workers=args.workers,
+            output=args.output,
+        )
+        for family, result in tuned.items():
+            print(f"{family}: {result['params']} (score {result['score']:.2f})")
+    else:
+        telemetry = Telemetry("telemetry.jsonl")
+        with telemetry.phase("load"):
+            testcase = Testcase.from_csv(args.testcase)
+        portfolio = Portfolio(
+            mode=args.mode,
+            time_limit=args.time_limit,
+            threads=args.threads,
+            telemetry=telemetry,
+        )
+        portfolio.solve(testcase)
+        portfolio.report()
+        solution = portfolio.to_solution(testcase)
+        if solution:
+            portfolio.draw_solution(solution)
+        telemetry.close()
@@ -0,0 +1,79 @@
+import numpy as np
+
+from Combinations import TableCombinations
+from Occupancy import Occupancy
+
+
+class Presolve:
+    """Per-group reductions that hold before any group is seated.
+
+    For every group ``g``:
+
+    - ``subsets[g]``: the connected table subsets with enough seats and at
+      most ``Hg`` tables that are free together for a whole meal somewhere
+      in the first ``horizon`` periods, in ``TableCombinations`` order, and
+      ``first[g]``, the earliest such start of each. Seating other groups
+      only delays these starts.
+    - ``tables[g]``: the tables that appear in some subset; no other table
+      can ever host the group.
+    - ``earliest[g]``: the earliest start over all subsets (-1 if none).
+    - ``latest[g]``: the latest start allowed by the maximum wait, ``U - S``.
+    - ``infeasible[g]``: why the group cannot be seated, if it cannot:
+      ``"seats"`` (no subset seats it), ``"blocked"`` (every subset is
+      blocked for the whole horizon) or ``"wait"`` (it cannot start before
+      ``latest``). Only the first two matter to a solver that ignores the
+      maximum wait, like FCFS.
+
+    Periods past ``testcase.horizon`` are free unless ``horizon`` ends
+    earlier.
+    """
+
+    def __init__(self, testcase, horizon=None):
+        N = testcase.Ng
+        P = testcase.Pg
+        H = testcase.Hg
+        self.horizon = int(testcase.horizon if horizon is None else horizon)
+        occupancy = Occupancy.from_intervals(testcase.blocked, self.horizon)
+        combinations = TableCombinations(testcase.Md, testcase.Cij)
+
+        num_groups = int(len(N))
+        self.latest = np.asarray(testcase.Ug) - np.asarray(testcase.Sg)
+        self.earliest = np.full(num_groups, -1)
+        self.subsets = []
+        self.first = []
+        self.tables = []
+        self.infeasible = {}
+        # Groups with the same size, table limit and duration share the result
+        seen = {}
+        for g in range(num_groups):
+            key = (int(N[g]), int(H[g]), int(P[g]))
+            if key not in seen:
+                subsets = combinations.feasible(N[g], H[g])
+                starts = [occupancy.earliest_start(tables, P[g]) for tables in subsets]
+                kept = [k for k, t in enumerate(starts) if t is not None]
+                seen[key] = (
+                    [subsets[k] for k in kept],
+                    [starts[k] for k in kept],
+                    "seats" if not subsets else "blocked",
+                )
+            subsets, first, reason = seen[key]
+            self.subsets.append(subsets)
+            self.first.append(first)
+            self.tables.append(sorted({d for tables in subsets for d in tables}))
+            if not subsets:
+                self.infeasible[g] = reason
+                continue
+            self.earliest[g] = min(first)
+            if self.earliest[g] > self.latest[g]:
+                self.infeasible[g] = "wait"
+
+    def __repr__(self):
+        kept = sum(len(subsets) for subsets in self.subsets)
+        return (
+            f"Presolve({len(self.subsets)} groups, {kept} table subsets, "
+            f"{len(self.infeasible)} infeasible)"
+        )
+
+    def seatable(self, g):
+        """True if group ``g`` can be seated when the maximum wait is ignored."""
+        return self.infeasible.get(g) in (None, "wait")
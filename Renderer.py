@@ -0,0 +1,138 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import numpy as np
+
+
+def has_display():
+    """Return True if figures can be shown on screen."""
+    if sys.platform in ("win32", "darwin"):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+# Without a display, render off-screen unless the user picked a backend
+if not has_display() and "MPLBACKEND" not in os.environ:
+    matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+from matplotlib.patches import Patch
+from matplotlib.ticker import MaxNLocator
+
+from Schedule import Schedule
+
+
+def allocation_stints(a):
+    """Merge a G x D x T 0/1 allocation into one stint per contiguous run.
+
+    Returns ``(groups, tables, starts, durations)`` arrays with one entry
+    per run of consecutive occupied periods of a group on a table.
+    """
+    a = np.asarray(a) > 0.5
+    num_groups, num_tables, horizon = a.shape
+    padded = np.zeros((num_groups, num_tables, horizon + 2), dtype=np.int8)
+    padded[:, :, 1:-1] = a
+    edges = np.diff(padded, axis=2)
+    groups, tables, starts = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)[2]
+    return groups, tables, starts, ends - starts
+
+
+def schedule_stints(schedule):
+    """Return the stints of a ``Schedule`` as ``(groups, tables, starts, durations)``."""
+    stints = np.array(list(schedule.stints()), dtype=int).reshape(-1, 4)
+    return stints[:, 0], stints[:, 1], stints[:, 2], stints[:, 3]
+
+
+class Renderer:
+    """Gantt charts of seating plans, one horizontal bar per stint.
+
+    All stints are drawn with a single ``barh`` call, tick labels are thinned
+    to a readable number, and each figure is written in every format of
+    ``formats`` and closed. ``show`` defaults to whether a display is
+    available, so batch runs never block.
+    """
+
+    MAX_LEGEND = 20
+
+    def __init__(self, output_dir=".", formats=("png",), show=None):
+        self.output_dir = output_dir
+        self.formats = tuple(formats)
+        self.show = has_display() if show is None else show
+
+    def draw(self, stints, num_groups, num_tables, horizon, name):
+        """Draw ``stints`` and save them as ``<output_dir>/<name>.<format>``."""
+        groups, tables, starts, durations = (np.asarray(v) for v in stints)
+        width = min(6.4 + horizon / 40, 40)
+        height = min(4.8 + num_tables / 10, 30)
+        fig, gnt = plt.subplots(figsize=(width, height))
+
+        gnt.set_xlabel("Time")
+        gnt.set_ylabel("Tables")
+        gnt.set_xlim(0, max(horizon, 1))
+        gnt.set_ylim(-0.5, num_tables - 0.5)
+        gnt.xaxis.set_major_locator(MaxNLocator(nbins=20, integer=True))
+        gnt.yaxis.set_major_locator(MaxNLocator(nbins=30, integer=True))
+        gnt.grid(True)
+
+        colors = plt.get_cmap("tab20")
+        gnt.barh(
+            tables,
+            durations,
+            left=starts,
+            height=0.8,
+            color=[colors(g % 20) for g in groups],
+        )
+
+        if num_groups <= self.MAX_LEGEND:
+            gnt.legend(
+                handles=[
+                    Patch(facecolor=colors(g % 20), label=f"Group {g+1}")
+                    for g in range(num_groups)
+                ]
+            )
+
+        paths = []
+        for fmt in self.formats:
+            paths.append(os.path.join(self.output_dir, f"{name}.{fmt}"))
+            fig.savefig(paths[-1])
+        if self.show:
+            plt.show()
+        plt.close(fig)
+        return paths
+
+    def draw_schedule(self, schedule, name):
+        return self.draw(
+            schedule_stints(schedule),
+            len(schedule),
+            schedule.num_tables,
+            schedule.horizon,
+            name,
+        )
+
+    def draw_allocation(self, a, name):
+        num_groups, num_tables, horizon = np.shape(a)
+        return self.draw(allocation_stints(a), num_groups, num_tables, horizon, name)
+
+    def draw_solution(self, solution, name):
+        """Draw a ``Schedule`` or a solution dict holding the dense ``a``."""
+        if isinstance(solution, Schedule):
+            return self.draw_schedule(solution, name)
+        return self.draw_allocation(solution["a"], name)
+
+
+def _render(schedule, output_dir, name, formats):
+    return Renderer(output_dir, formats, show=False).draw_schedule(schedule, name)
+
+
+def render_batch(jobs, formats=("png",), workers=None):
+    """Render ``(schedule, output_dir, name)`` jobs on a process pool; return the files."""
+    jobs = list(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_render, schedule, output_dir, name, formats)
+            for schedule, output_dir, name in jobs
+        ]
+        return [path for future in futures for path in future.result()]
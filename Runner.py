@@ -0,0 +1,238 @@
+import argparse
+import contextlib
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from Backends import BACKENDS, make_solver
+from Cache import Cache
+from FCFS import FCFS
+from Renderer import Renderer
+from Telemetry import Telemetry
+from Testcase import Testcase
+
+# Solver.MODES, repeated so that runs without Gurobi need no gurobipy
+MODES = ("assignment", "start", "column")
+FIELDS = ["instance", "method", "status", "objective", "gap", "wall_time", "error"]
+
+
+def find_instances(roots):
+    """Return every ``testcase*.csv`` and ``testcase*.npz`` below the given directories."""
+    paths = []
+    for root in roots:
+        for pattern in ("testcase*.csv", "testcase*.npz"):
+            paths.extend(sorted(Path(root).rglob(pattern)))
+    return paths
+
+
+def output_dir_for(path):
+    """Results go next to the instance.
+
+    ``testcase.csv`` and ``testcase_data.csv`` own their directory. Any other
+    ``testcase*.csv`` gets a ``<name>_results`` directory beside it, so it
+    never writes into another instance's directory (``hantiange/testcase_1.csv``
+    sits next to ``hantiange/testcase_1/``).
+    """
+    path = Path(path)
+    if path.stem in ("testcase", "testcase_data"):
+        return path.parent
+    return path.parent / f"{path.stem}_results"
+
+
+def run_instance(
+    path,
+    mode="column",
+    threads=1,
+    time_limit=None,
+    formats=(),
+    backends=("gurobi",),
+    params=None,
+    cache_dir=None,
+):
+    """Solve one instance with FCFS and each of ``backends``; return one row per run.
+
+    All runs share one ``telemetry.jsonl`` in the output directory. Every
+    schedule is drawn in each of ``formats`` (for example ``("svg",)``).
+    ``params`` are extra Gurobi parameters, such as a tuned set. With
+    ``cache_dir``, FCFS and Gurobi results are reused from that ``Cache``.
+    """
+    out = output_dir_for(path)
+    out.mkdir(parents=True, exist_ok=True)
+    renderer = Renderer(out, formats, show=False)
+    (out / "telemetry.jsonl").unlink(missing_ok=True)
+    telemetry = Telemetry(out / "telemetry.jsonl")
+    with telemetry.phase("load"):
+        if str(path).endswith(".npz"):
+            testcase = Testcase.load(path)
+        else:
+            testcase = Testcase.from_csv(path)
+    cache = Cache(cache_dir) if cache_dir is not None else None
+    rows = []
+
+    with open(out / "run.log", "w") as log, contextlib.redirect_stdout(log):
+        row = {"instance": str(path), "method": "FCFS"}
+        start = time.perf_counter()
+        try:
+            fcfs = FCFS(output_dir=out, telemetry=telemetry, cache=cache)
+            allocation = fcfs.solve(testcase)
+            if formats:
+                with telemetry.phase("draw"):
+                    renderer.draw_allocation(allocation, "FCFS")
+            # FCFS proves no bound, so it has no gap
+            row.update(status="done", objective=fcfs.objective, gap=None)
+        except Exception as e:
+            row.update(status="error", error=repr(e))
+        row["wall_time"] = time.perf_counter() - start
+        rows.append(row)
+
+        for backend in backends:
+            method = f"gurobi-{mode}" if backend == "gurobi" else backend
+            row = {"instance": str(path), "method": method}
+            start = time.perf_counter()
+            try:
+                options = {}
+                if backend == "gurobi":
+                    options = {"params": params, "cache": cache}
+                solver = make_solver(
+                    backend,
+                    mode=mode,
+                    time_limit=time_limit,
+                    threads=threads,
+                    output_dir=out,
+                    telemetry=telemetry,
+                    **options,
+                )
+                solver.solve(testcase)
+                row.update(
+                    status=solver.status, objective=solver.objective, gap=solver.gap
+                )
+                if formats and solver.objective is not None:
+                    schedule = solver.to_solution(testcase, sparse=True)
+                    with telemetry.phase("draw"):
+                        renderer.draw_schedule(schedule, backend)
+            except Exception as e:
+                row.update(status="error", error=repr(e))
+            row["wall_time"] = time.perf_counter() - start
+            rows.append(row)
+    telemetry.close()
+    return rows
+
+
+def run_all(
+    roots,
+    workers=None,
+    threads=1,
+    mode="column",
+    time_limit=None,
+    formats=(),
+    backends=("gurobi",),
+    tuned=None,
+    cache_dir=None,
+):
+    """Run every instance below ``roots`` on a process pool.
+
+    Each worker gets ``threads`` solver threads; by default the pool is
+    sized so that workers times threads fills the machine. With ``tuned``,
+    the file written by ``Portfolio.tune``, each instance uses the Gurobi
+    parameters tuned for its root directory.
+    """
+    families = {
+        path: Path(root).name for root in roots for path in find_instances([root])
+    }
+    paths = list(families)
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // threads)
+    print(f"{len(paths)} instances, {workers} workers x {threads} threads")
+    params = dict.fromkeys(paths)
+    if tuned:
+        # Imported here so that runs without tuned parameters need no gurobipy
+        from Portfolio import load_params
+
+        params = {path: load_params(families[path], tuned) for path in paths}
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                run_instance,
+                path,
+                mode,
+                threads,
+                time_limit,
+                formats,
+                backends,
+                params[path],
+                cache_dir,
+            ): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            for row in future.result():
+                results.append(row)
+                print(
+                    f"{row['instance']:45s} {row['method']:18s} "
+                    f"{row.get('objective')} ({row['wall_time']:.2f}s)"
+                )
+    results.sort(key=lambda row: (row["instance"], row["method"]))
+    return results
+
+
+def write_summary(results, prefix):
+    with open(f"{prefix}.json", "w") as f:
+        json.dump(results, f, indent=2)
+    with open(f"{prefix}.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in results:
+            writer.writerow({key: row.get(key) for key in FIELDS})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run FCFS and the MIP/CP solvers on stored testcases"
+    )
+    parser.add_argument("roots", nargs="*", default=["dapu", "hantiange"])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--mode", choices=MODES, default="column")
+    parser.add_argument(
+        "--backends", nargs="+", choices=list(BACKENDS), default=["gurobi"]
+    )
+    parser.add_argument("--time-limit", type=float, default=None)
+    parser.add_argument(
+        "--tuned",
+        default=None,
+        metavar="FILE",
+        help="use the per-family Gurobi parameters saved by Portfolio.py tune",
+    )
+    parser.add_argument(
+        "--cache",
+        default=None,
+        metavar="DIR",
+        help="reuse FCFS and Gurobi results stored in this directory",
+    )
+    parser.add_argument("--summary", default="summary")
+    parser.add_argument(
+        "--draw",
+        nargs="+",
+        default=[],
+        metavar="FORMAT",
+        help="save Gantt charts in these formats, e.g. --draw png svg",
+    )
+    args = parser.parse_args()
+
+    results = run_all(
+        args.roots,
+        args.workers,
+        args.threads,
+        args.mode,
+        args.time_limit,
+        args.draw,
+        args.backends,
+        args.tuned,
+        args.cache,
+    )
+    write_summary(results, args.summary)
@@ -0,0 +1,60 @@
+import numpy as np
+
+
+class Schedule:
+    """Sparse seating result: one start time and one table list per group.
+
+    ``starts[g]`` is -1 for a group that was not seated. Group ``g`` holds
+    every table in ``tables[g]`` during ``[starts[g], starts[g] + durations[g])``.
+    """
+
+    def __init__(self, starts, tables, durations, num_tables, horizon):
+        self.starts = np.asarray(starts, dtype=int)
+        self.tables = [list(map(int, ts)) for ts in tables]
+        self.durations = np.asarray(durations, dtype=int)
+        self.num_tables = int(num_tables)
+        self.horizon = int(horizon)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @staticmethod
+    def from_allocation(a):
+        """Build a schedule from a G x D x T 0/1 allocation array."""
+        a = np.asarray(a) > 0.5
+        num_groups, num_tables, horizon = a.shape
+        busy = a.any(axis=1)
+        seated = busy.any(axis=1)
+        starts = np.where(seated, busy.argmax(axis=1), -1)
+        durations = busy.sum(axis=1)
+        used = a.any(axis=2)
+        tables = [np.flatnonzero(used[g]).tolist() for g in range(num_groups)]
+        return Schedule(starts, tables, durations, num_tables, horizon)
+
+    def stints(self):
+        """Yield ``(group, table, start, duration)`` for every occupied table."""
+        for g, tables in enumerate(self.tables):
+            if self.starts[g] < 0:
+                continue
+            for d in tables:
+                yield g, d, int(self.starts[g]), int(self.durations[g])
+
+    def to_solution(self):
+        """Materialise the dense ``a``, ``b``, ``x`` and ``c`` arrays."""
+        num_groups = len(self)
+        a = np.zeros((num_groups, self.num_tables, self.horizon))
+        b = np.zeros((num_groups, self.num_tables))
+        x = np.zeros((num_groups, self.horizon))
+        for g, d, start, duration in self.stints():
+            a[g, d, start : start + duration] = 1
+            b[g, d] = 1
+            x[g, start] = 1
+        c = b[:, :, None] * b[:, None, :]
+        return {"a": a, "b": b, "x": x, "c": c}
+
+
+def as_solution(schedule, sparse=False):
+    """What ``to_solution`` returns for ``schedule``: itself if ``sparse``, else its dense arrays."""
+    if schedule is None:
+        return None
+    return schedule if sparse else schedule.to_solution()
@@ -1,64 +1,493 @@
+import os
 import gurobipy as gp
 from gurobipy import GRB
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.patches import Patch
 from Testcase import Testcase
+from MatrixBuilder import MatrixBuilder
+from Renderer import Renderer
+from Schedule import Schedule
+from Symmetry import Symmetry
+from FCFS import FCFS
+from Telemetry import Telemetry
+from Validator import Validator
 
 
 class Solver:
-    def __init__(self):
+    MODES = ("assignment", "start", "column")
+    BUILDERS = ("quicksum", "matrix")
+    # How the tables of a group are kept connected outside column mode
+    CONNECTIVITY = ("pairs", "lazy")
+    # Gurobi parameters used unless ``params`` overrides them
+    DEFAULT_PARAMS = {"MIPFocus": 3}
+
+    def __init__(
+        self,
+        mode="assignment",
+        builder="quicksum",
+        warm_start=False,
+        time_limit=None,
+        threads=None,
+        output_dir=".",
+        telemetry=None,
+        symmetry=False,
+        params=None,
+        seed=None,
+        stop=None,
+        connectivity="pairs",
+        cache=None,
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode {mode!r}, expected one of {self.MODES}")
+        if builder not in self.BUILDERS:
+            raise ValueError(
+                f"Unknown builder {builder!r}, expected one of {self.BUILDERS}"
+            )
+        if connectivity not in self.CONNECTIVITY:
+            raise ValueError(
+                f"Unknown connectivity {connectivity!r}, "
+                f"expected one of {self.CONNECTIVITY}"
+            )
+        self.mode = mode
+        self.builder = builder
+        # Columns are connected subsets already, so column mode ignores it
+        self.connectivity = None if mode == "column" else connectivity
+        self.warm_start = warm_start
+        self.time_limit = time_limit
+        self.threads = threads
+        self.output_dir = output_dir
+        self.telemetry = telemetry if telemetry is not None else Telemetry()
+        self.symmetry = symmetry
+        self.params = {**self.DEFAULT_PARAMS, **(params or {})}
+        self.seed = seed
+        # Event-like object; the solve is cut short once it is set
+        self.stop = stop
+        self.cache = cache
+        # Metadata and schedule of a result served from the cache
+        self.cached = None
+        self._cached_schedule = None
         self.model = None
         self.solution = None
+        self.horizon = None
+        self.root_bound = None
+        self.columns = None
+        self.presolve = None
+        # Failed checks of the returned plan, keyed by check name
+        self.violations = None
+        # Adjacent tables of each table, for the lazy connectivity cuts
+        self._neighbors = None
 
-    def solve(self, testcase):
+    def time_windows(self, testcase):
+        """Derive the horizon and the periods each group can actually use.
+
+        A group may start on table ``d`` at ``t`` only if ``t <= U - S`` and
+        ``d`` is free for the whole meal starting at ``t``; it may start at
+        ``t`` if this holds for at least one table. A cell ``(d, t)`` is
+        usable by the group only if it is covered by such a start on ``d``.
+
+        Works on the free gaps between blocked intervals, so the cost grows
+        with the number of intervals rather than with tables x periods. Only
+        the tables the presolve keeps for a group are scanned, and no start
+        comes before its earliest possible one.
+        """
+        P = testcase.Pg
+        U = testcase.Ug
+        S = testcase.Sg
+
+        num_groups = int(len(P))
+        num_tables = int(len(testcase.Md))
+        latest = np.asarray(U) - np.asarray(S)
+        feasible = latest >= 0
+        T_star = int(max((latest + P)[feasible], default=max(P)))
+        self.presolve = testcase.presolve(T_star)
+
+        # Free gaps per table; periods beyond the recorded unavailability are free
+        width = min(T_star, testcase.horizon)
+        gaps = []
+        for intervals in testcase.blocked:
+            free = []
+            t = 0
+            for start, end in intervals:
+                if start >= width:
+                    break
+                if start > t:
+                    free.append((t, start))
+                t = max(t, min(end, width))
+            if t < T_star:
+                free.append((t, T_star))
+            gaps.append(free)
+
+        starts = {}
+        table_starts = {}
+        cells = {}
+        for g in range(num_groups):
+            if not feasible[g]:
+                starts[g] = []
+                continue
+            duration = int(P[g])
+            first = int(self.presolve.earliest[g])
+            last = int(latest[g])
+            any_table = set()
+            for d in range(num_tables):
+                table_starts[g, d] = []
+                cells[g, d] = []
+            for d in self.presolve.tables[g]:
+                for begin, end in gaps[d]:
+                    begin = max(begin, first)
+                    stop = min(end - duration, last)
+                    if stop < begin:
+                        continue
+                    # starts [begin, stop] cover cells [begin, stop + duration)
+                    table_starts[g, d].extend(range(begin, stop + 1))
+                    cells[g, d].extend(range(begin, stop + duration))
+                any_table.update(table_starts[g, d])
+            starts[g] = sorted(any_table)
+
+        return T_star, starts, table_starts, cells
+
+    def build(self, testcase):
         # Create a new model
         self.model = gp.Model("restaurant_seating")
-        self.model.params.MIPFocus = 3
+        for name, value in self.params.items():
+            self.model.setParam(name, value)
+        if self.seed is not None:
+            self.model.params.Seed = self.seed
+        if self.time_limit is not None:
+            self.model.params.TimeLimit = self.time_limit
+        if self.threads is not None:
+            self.model.params.Threads = self.threads
+
+        num_groups = int(len(testcase.Ng))
+        num_tables = int(len(testcase.Md))
+        with self.telemetry.phase("time_windows"):
+            T_star, starts, table_starts, cells = self.time_windows(testcase)
+        self.horizon = T_star
+        print(f"Number of groups: {num_groups}")
+        print(f"Number of tables: {num_tables}")
+        print(f"Total time periods: {T_star}")
+        print(f"Model mode: {self.mode} ({self.builder} builder)")
+        print(self.presolve)
+        for g, reason in sorted(self.presolve.infeasible.items()):
+            print(f"Group {g} cannot be seated: {reason}")
+        self.telemetry.emit(
+            "presolve",
+            tables=sum(len(tables) for tables in self.presolve.tables),
+            subsets=sum(len(subsets) for subsets in self.presolve.subsets),
+            infeasible={
+                int(g): reason for g, reason in self.presolve.infeasible.items()
+            },
+        )
+
+        matrix = None
+        if self.builder == "matrix":
+            matrix = MatrixBuilder(self.model, testcase, T_star, self.telemetry)
+
+        if self.mode == "column":
+            with self.telemetry.phase("columns"):
+                columns, z_keys, cost = self._enumerate_columns(testcase, table_starts)
+            self.columns = columns
+            if matrix:
+                self.solution = {"z": matrix.column(columns, z_keys, cost)}
+            else:
+                self.solution = self._build_column(testcase, z_keys, cost)
+        elif matrix:
+            b, c, x = matrix.table_choice(starts, self.connectivity == "pairs")
+            self.solution = {"b": b, "x": x}
+            if c is not None:
+                self.solution["c"] = c
+            if self.mode == "start":
+                self.solution["y"] = matrix.start(table_starts)
+            else:
+                self.solution["a"] = matrix.assignment(cells)
+        else:
+            b, c, x = self._build_table_choice(testcase, starts)
+
+            # Link tables and start times to the time axis
+            self.solution = {"b": b, "x": x}
+            if c is not None:
+                self.solution["c"] = c
+            if self.mode == "start":
+                self.solution["y"] = self._build_start(testcase, b, x, table_starts)
+            else:
+                self.solution["a"] = self._build_assignment(testcase, b, x, cells)
+        if self.connectivity == "lazy":
+            self.model.params.LazyConstraints = 1
+            C = np.asarray(testcase.Cij) == 1
+            self._neighbors = [
+                set(np.flatnonzero(C[d])) - {d} for d in range(num_tables)
+            ]
+        if "b" in self.solution:
+            # Tables outside every usable subset of a group stay unused
+            for g, tables in enumerate(self.presolve.tables):
+                for d in set(range(num_tables)) - set(tables):
+                    self.solution["b"][g, d].UB = 0
+        if self.symmetry:
+            with self.telemetry.phase("symmetry"):
+                self._build_symmetry(testcase)
+            # Gurobi's own symmetry handling fights the explicit orderings
+            self.model.params.Symmetry = 0
+        with self.telemetry.phase("update"):
+            self.model.update()
+        self.telemetry.emit(
+            "model",
+            mode=self.mode,
+            builder=self.builder,
+            groups=num_groups,
+            tables=num_tables,
+            horizon=T_star,
+            vars=self.model.NumVars,
+            constrs=self.model.NumConstrs,
+            nonzeros=self.model.NumNZs,
+        )
+
+    def solve(self, testcase):
+        key = None
+        self.cached = self._cached_schedule = None
+        if self.cache is not None:
+            key = self.cache.key(testcase, "gurobi", self._cache_options())
+            with self.telemetry.phase("cache"):
+                hit = self.cache.get(key)
+            if hit is not None:
+                self._cached_schedule, self.cached = hit
+                self.horizon = self.cached["horizon"]
+                self.root_bound = self.cached["root_bound"]
+                self.telemetry.emit("cache_hit", key=key, **self.cached)
+                self.validate(testcase)
+                self._write_result(self.cached["runtime"])
+                return
+
+        with self.telemetry.phase("build"):
+            self.build(testcase)
+        if self.warm_start:
+            with self.telemetry.phase("warm_start"):
+                allocation = FCFS().solve(testcase, report=False)
+                self.set_start(testcase, Schedule.from_allocation(allocation))
+
+        # Optimize the model
+        with self.telemetry.phase("optimize"):
+            self.optimize()
+        self.telemetry.emit(
+            "result",
+            status=self.model.Status,
+            objective=self.model.ObjVal if self.model.SolCount > 0 else None,
+            gap=self.model.MIPGap if self.model.SolCount > 0 else None,
+            bound=self.model.ObjBound if self.model.IsMIP else None,
+            root_bound=self.root_bound,
+            runtime=self.model.Runtime,
+            nodes=self.model.NodeCount,
+        )
+        self.validate(testcase)
+        self._write_result(self.model.Runtime)
+
+        if key is not None and self.objective is not None:
+            self.cache.put(
+                key,
+                self.to_solution(testcase, sparse=True),
+                status=self.status,
+                objective=self.objective,
+                gap=self.gap,
+                root_bound=self.root_bound,
+                runtime=self.model.Runtime,
+            )
+
+    def _write_result(self, runtime):
+        with open(os.path.join(self.output_dir, "gurobi.txt"), "w") as f:
+            if self.objective is not None:
+                f.write("Objective Value: " + str(self.objective) + "\n")
+                f.write("Gap: " + str(self.gap) + "\n")
+            else:
+                f.write("Objective Value: None\n")
+            f.write("Root Bound: " + str(self.root_bound) + "\n")
+            f.write("Runtime: " + str(runtime) + "\n")
+            if self.violations:
+                f.write("Violations: " + str(self.violations) + "\n")
+
+    def validate(self, testcase):
+        """Check the returned plan independently of the model and recompute its objective."""
+        self.violations = None
+        if self.objective is None:
+            return
+        with self.telemetry.phase("validate"):
+            validator = Validator(testcase)
+            schedule = self.to_solution(testcase, sparse=True)
+            self.violations = validator.check(schedule)
+            objective = validator.objective(schedule)
+            if abs(objective - self.objective) > 1e-6 * max(1.0, abs(objective)):
+                self.violations["objective"] = [objective]
+        self.telemetry.emit("validation", violations=self.violations)
+        if self.violations:
+            print("Violations:", self.violations)
+
+    def _cache_options(self):
+        """Settings that change the result, and so the cache key."""
+        options = {
+            "mode": self.mode,
+            "builder": self.builder,
+            "warm_start": self.warm_start,
+            "symmetry": self.symmetry,
+            "params": self.params,
+            "seed": self.seed,
+            "time_limit": self.time_limit,
+        }
+        if self.connectivity is not None:
+            options["connectivity"] = self.connectivity
+        return options
+
+    def optimize(self):
+        """Optimize the built model through the callback, which adds lazy cuts."""
+        self.root_bound = None
+        self.model.optimize(self._callback)
+
+    def set_start(self, testcase, schedule):
+        """Use ``schedule`` as a MIP start for the built model.
+
+        Groups whose start time or tables have no variable in the model
+        (for example an FCFS start past ``U - S``) are left undefined, so
+        Gurobi completes a partial start for them.
+        """
+        P = testcase.Pg
+
+        ones = {name: set() for name in self.solution}
+        covered = set()
+        for g, tables in enumerate(schedule.tables):
+            s = int(schedule.starts[g])
+            tables = sorted(tables)
+            if s < 0:
+                continue
+            if "z" in self.solution:
+                if tuple(tables) not in self.columns[g]:
+                    continue
+                key = (g, self.columns[g].index(tuple(tables)), s)
+                if key not in self.solution["z"]:
+                    continue
+                ones["z"].add(key)
+            else:
+                group = {
+                    "x": [(g, s)],
+                    "b": [(g, d) for d in tables],
+                    "c": [(g, i, j) for i in tables for j in tables],
+                }
+                if "y" in self.solution:
+                    group["y"] = [(g, d, s) for d in tables]
+                else:
+                    group["a"] = [(g, d, t) for d in tables for t in range(s, s + P[g])]
+                group = {
+                    name: keys for name, keys in group.items() if name in self.solution
+                }
+                if any(
+                    key not in self.solution[name]
+                    for name, keys in group.items()
+                    for key in keys
+                ):
+                    continue
+                for name, keys in group.items():
+                    ones[name].update(keys)
+            covered.add(g)
+
+        for name, variables in self.solution.items():
+            keys = [key for key in variables if key[0] in covered]
+            self.model.setAttr(
+                "Start",
+                [variables[key] for key in keys],
+                [1.0 if key in ones[name] else 0.0 for key in keys],
+            )
+        print(f"MIP start covers {len(covered)} of {len(schedule)} groups")
+
+    def _callback(self, model, where):
+        if where == GRB.Callback.MIPNODE:
+            if model.cbGet(GRB.Callback.MIPNODE_NODCNT) == 0:
+                self.root_bound = model.cbGet(GRB.Callback.MIPNODE_OBJBND)
+        if where == GRB.Callback.MIPSOL and self.connectivity == "lazy":
+            self._cut_disconnected(model)
+        # MIP callbacks come regularly but not on every node
+        if where == GRB.Callback.MIP and self.stop is not None and self.stop.is_set():
+            model.terminate()
+        self.telemetry.gurobi_progress(model, where)
+
+    def _cut_disconnected(self, model):
+        """Cut off solutions in which a group's tables are not connected in ``Cij``.
+
+        For a connected piece ``K`` of a group's tables and a chosen table
+        ``j`` outside it, any connected choice holding a table of ``K`` and
+        ``j`` must also hold a neighbour of ``K``.
+        """
+        b = self.solution["b"]
+        values = model.cbGetSolution(b)
+        chosen = {}
+        for (g, d), value in values.items():
+            if value > 0.5:
+                chosen.setdefault(g, set()).add(d)
+        cuts = 0
+        for g, tables in chosen.items():
+            pieces = []
+            left = set(tables)
+            while left:
+                piece = set()
+                frontier = [left.pop()]
+                while frontier:
+                    d = frontier.pop()
+                    piece.add(d)
+                    for e in self._neighbors[d] & left:
+                        left.discard(e)
+                        frontier.append(e)
+                pieces.append(piece)
+            if len(pieces) < 2:
+                continue
+            for piece in pieces:
+                boundary = set().union(*(self._neighbors[d] for d in piece)) - piece
+                i, j = min(piece), min(tables - piece)
+                model.cbLazy(
+                    b[g, i] + b[g, j] - 1 <= gp.quicksum(b[g, k] for k in boundary)
+                )
+                cuts += 1
+        if cuts:
+            self.telemetry.emit("lazy_cuts", cuts=cuts)
+
+    def _add_vars(self, *args, name, **kwargs):
+        with self.telemetry.phase("variables", family=name):
+            return self.model.addVars(*args, name=name, **kwargs)
+
+    def _add_constrs(self, constrs, name):
+        with self.telemetry.phase("constraints", family=name):
+            return self.model.addConstrs(constrs, name=name)
 
-        # Extract data from testcase
+    def _build_table_choice(self, testcase, starts):
+        """Table choice b, combination c and start x shared by the time-indexed modes."""
         N = testcase.Ng
         M = testcase.Md
         C = testcase.Cij
-        P = testcase.Pg
-        U = testcase.Ug
         S = testcase.Sg
         H = testcase.Hg
-        O = testcase.Odt
         alpha = testcase.alpha
 
         num_groups = int(len(N))
         num_tables = int(len(M))
-        T_star = int(max(U) + max(P)) * num_groups
-        print(f"Number of groups: {num_groups}")
-        print(f"Number of tables: {num_tables}")
-        print(f"Total time periods: {T_star}")
 
-        # Decision variables
-        a = self.model.addVars(
-            num_groups, num_tables, T_star, vtype=GRB.BINARY, name="a"
-        )
-        b = self.model.addVars(num_groups, num_tables, vtype=GRB.BINARY, name="b")
-        c = self.model.addVars(
-            num_groups, num_tables, num_tables, vtype=GRB.BINARY, name="c"
-        )
-        x = self.model.addVars(num_groups, T_star, vtype=GRB.BINARY, name="x")
+        # Decision variables, only inside each group's feasible window
+        x_keys = [(g, t) for g in range(num_groups) for t in starts[g]]
+        b = self._add_vars(num_groups, num_tables, vtype=GRB.BINARY, name="b")
+        c = None
+        if self.connectivity == "pairs":
+            c = self._add_vars(
+                num_groups, num_tables, num_tables, vtype=GRB.BINARY, name="c"
+            )
+        x = self._add_vars(x_keys, vtype=GRB.BINARY, name="x")
 
         # Objective function
-        wait_time = gp.quicksum(
-            N[g] * (gp.quicksum(t * x[g, t] for t in range(T_star)) + S[g])
-            for g in range(num_groups)
-        )
-        table_minimization = gp.quicksum(
-            alpha * (H[g] - gp.quicksum(b[g, d] for d in range(num_tables)))
-            for g in range(num_groups)
-        )
+        with self.telemetry.phase("objective"):
+            wait_time = gp.quicksum(
+                N[g] * (gp.quicksum(t * x[g, t] for t in starts[g]) + S[g])
+                for g in range(num_groups)
+            )
+            table_minimization = gp.quicksum(
+                alpha * (H[g] - gp.quicksum(b[g, d] for d in range(num_tables)))
+                for g in range(num_groups)
+            )
 
-        self.model.setObjective(wait_time - table_minimization, GRB.MINIMIZE)
+            self.model.setObjective(wait_time - table_minimization, GRB.MINIMIZE)
         # self.model.setObjective(wait_time, GRB.MINIMIZE)
 
         # Constraints
-        self.model.addConstrs(
+        self._add_constrs(
             (
                 gp.quicksum(M[d] * b[g, d] for d in range(num_tables)) >= N[g]
                 for g in range(num_groups)
@@ -75,127 +504,321 @@ class Solver:
         #     name="table_combination",
         # )
 
-        self.model.addConstrs(
-            (
-                2 * c[g, i, j] <= b[g, i] + b[g, j]
-                for g in range(num_groups)
-                for i in range(num_tables)
-                for j in range(num_tables)
-            ),
-            name="table_combination_2",
-        )
+        # Lazy connectivity is enforced by cut-set cuts in the callback instead
+        if c is not None:
+            self._add_constrs(
+                (
+                    2 * c[g, i, j] <= b[g, i] + b[g, j]
+                    for g in range(num_groups)
+                    for i in range(num_tables)
+                    for j in range(num_tables)
+                ),
+                name="table_combination_2",
+            )
 
-        self.model.addConstrs(
+            self._add_constrs(
+                (
+                    gp.quicksum(
+                        C[i, j] * c[g, i, j]
+                        for i in range(num_tables)
+                        for j in range(i + 1, num_tables)
+                    )
+                    >= gp.quicksum(b[g, i] for i in range(num_tables)) - 1
+                    for g in range(num_groups)
+                ),
+                name="table_combination_3",
+            )
+        self._add_constrs(
             (
-                gp.quicksum(
-                    C[i, j] * c[g, i, j]
-                    for i in range(num_tables)
-                    for j in range(i + 1, num_tables)
-                )
-                >= gp.quicksum(b[g, i] for i in range(num_tables)) - 1
+                gp.quicksum(b[g, d] for d in range(num_tables)) <= H[g]
                 for g in range(num_groups)
             ),
-            name="table_combination_3",
+            name="max_tables",
         )
+        self._add_constrs(
+            (x.sum(g, "*") == 1 for g in range(num_groups)),
+            name="single_start",
+        )
+        return b, c, x
 
-        self.model.addConstrs(
-            (
-                a[g, d, t] <= b[g, d]
-                for g in range(num_groups)
-                for d in range(num_tables)
-                for t in range(T_star)
-            ),
+    def _build_assignment(self, testcase, b, x, cells):
+        """Occupancy a[g,d,t] tied to b and x through big-M constraints."""
+        P = testcase.Pg
+
+        num_groups = int(len(testcase.Ng))
+        num_tables = int(len(testcase.Md))
+
+        a_keys = [(g, d, t) for (g, d), ts in cells.items() for t in ts]
+        x_keys = list(x.keys())
+        a = self._add_vars(a_keys, vtype=GRB.BINARY, name="a")
+
+        self._add_constrs(
+            (a[g, d, t] <= b[g, d] for (g, d, t) in a_keys),
             name="assignment_match",
         )
-        self.model.addConstrs(
+        self._add_constrs(
             (
-                gp.quicksum(a[g, d, t] for t in range(T_star)) == P[g] * b[g, d]
+                a.sum(g, d, "*") == P[g] * b[g, d]
                 for g in range(num_groups)
                 for d in range(num_tables)
             ),
             name="meal_duration",
         )
-        self.model.addConstrs(
+        # Cells outside the window do not exist and count as 0
+        self._add_constrs(
             (
-                gp.quicksum(a[g, d, t2] for t2 in range(t, t + P[g]))
+                gp.quicksum(a.get((g, d, t2), 0) for t2 in range(t, t + P[g]))
                 + 9999 * (1 - b[g, d])
                 >= P[g] * x[g, t]
-                for g in range(num_groups)
+                for (g, t) in x_keys
                 for d in range(num_tables)
-                for t in range(T_star - P[g] + 1)
             ),
             name="continuous_assignment",
         )
-        self.model.addConstrs(
-            (
-                gp.quicksum(b[g, d] for d in range(num_tables)) <= H[g]
-                for g in range(num_groups)
-            ),
-            name="max_tables",
-        )
-        self.model.addConstrs(
+        self._add_constrs(
             (
-                x[g, 0] <= a[g, d, 0] + (1 - b[g, d])
-                for g in range(num_groups)
+                x[g, 0] <= a.get((g, d, 0), 0) + (1 - b[g, d])
+                for (g, t) in x_keys
+                if t == 0
                 for d in range(num_tables)
             ),
             name="start_time_0",
         )
-        self.model.addConstrs(
+        self._add_constrs(
             (
-                2 * x[g, t] <= a[g, d, t] - a[g, d, t - 1] + 1 + 2 * (1 - b[g, d])
-                for g in range(num_groups)
+                2 * x[g, t]
+                <= a.get((g, d, t), 0) - a.get((g, d, t - 1), 0) + 1 + 2 * (1 - b[g, d])
+                for (g, t) in x_keys
+                if t > 0
                 for d in range(num_tables)
-                for t in range(1, T_star)
             ),
             name="start_time",
         )
-        self.model.addConstrs(
+        # max_wait and table_unavailability are implied by the windows
+        occupants = {}
+        for g, d, t in a_keys:
+            occupants.setdefault((d, t), []).append(g)
+        shared = [key for key, groups in occupants.items() if len(groups) > 1]
+        self._add_constrs(
             (
-                x[g, t] <= 0
-                for g in range(num_groups)
-                for t in range(max(0, U[g] - S[g] + 1), T_star)
+                gp.quicksum(a[g, d, t] for g in occupants[d, t]) <= 1
+                for (d, t) in shared
+            ),
+            name="single_assignment",
+        )
+        return a
+
+    def _build_start(self, testcase, b, x, table_starts):
+        """Start variables y[g,d,s]; occupancy is a sliding-window sum of y.
+
+        Group g occupies table d at t iff it started there in
+        [t - P[g] + 1, t], so no big-M is needed to tie b and x together.
+        """
+        N = testcase.Ng
+        M = testcase.Md
+        P = testcase.Pg
+        H = testcase.Hg
+
+        num_tables = int(len(M))
+
+        y_keys = [(g, d, s) for (g, d), ss in table_starts.items() for s in ss]
+        y = self._add_vars(y_keys, vtype=GRB.BINARY, name="y")
+        x_keys = list(x.keys())
+
+        self._add_constrs(
+            (y[g, d, s] <= x[g, s] for (g, d, s) in y_keys),
+            name="start_together",
+        )
+        self._add_constrs(
+            (y.sum(g, d, "*") == b[g, d] for (g, d) in table_starts),
+            name="table_use",
+        )
+        self._add_constrs(
+            (
+                gp.quicksum(M[d] * y.get((g, d, s), 0) for d in range(num_tables))
+                >= N[g] * x[g, s]
+                for (g, s) in x_keys
             ),
-            name="max_wait",
+            name="start_capacity",
+        )
+        self._add_constrs(
+            (y.sum(g, "*", s) <= H[g] * x[g, s] for (g, s) in x_keys),
+            name="start_max_tables",
         )
-        self.model.addConstrs(
+
+        occupants = {}
+        for g, d, s in y_keys:
+            for t in range(s, s + P[g]):
+                occupants.setdefault((d, t), []).append((g, s))
+        shared = [key for key, starts in occupants.items() if len(starts) > 1]
+        self._add_constrs(
             (
-                gp.quicksum(a[g, d, t] for g in range(num_groups)) <= 1
-                for t in range(T_star)
-                for d in range(num_tables)
+                gp.quicksum(y[g, d, s] for (g, s) in occupants[d, t]) <= 1
+                for (d, t) in shared
             ),
             name="single_assignment",
         )
-        self.model.addConstrs(
+        return y
+
+    def _enumerate_columns(self, testcase, table_starts):
+        """Columns are (table subset, start time) pairs for each group.
+
+        Subsets are the connected subsets of ``Cij`` with enough seats and at
+        most ``Hg`` tables that the presolve kept; a start is kept if every
+        table of the subset is free for the whole meal.
+        """
+        N = testcase.Ng
+        S = testcase.Sg
+        H = testcase.Hg
+        alpha = testcase.alpha
+
+        num_groups = int(len(N))
+
+        columns = []
+        z_keys = []
+        cost = {}
+        for g in range(num_groups):
+            subsets = self.presolve.subsets[g]
+            columns.append(subsets)
+            for k, tables in enumerate(subsets):
+                # Groups past their maximum wait have no starts at all
+                common = set.intersection(
+                    *(set(table_starts.get((g, d), ())) for d in tables)
+                )
+                for s in sorted(common):
+                    z_keys.append((g, k, s))
+                    cost[g, k, s] = N[g] * (s + S[g]) - alpha * (H[g] - len(tables))
+        print(f"Number of columns: {len(z_keys)}")
+        return columns, z_keys, cost
+
+    def _build_column(self, testcase, z_keys, cost):
+        """Pick one column per group, with a capacity row per table and period."""
+        P = testcase.Pg
+
+        num_groups = int(len(testcase.Ng))
+
+        z = self._add_vars(z_keys, vtype=GRB.BINARY, obj=cost, name="z")
+        self.model.ModelSense = GRB.MINIMIZE
+
+        self._add_constrs(
+            (z.sum(g, "*", "*") == 1 for g in range(num_groups)),
+            name="single_column",
+        )
+        occupants = {}
+        for g, k, s in z_keys:
+            for d in self.columns[g][k]:
+                for t in range(s, s + P[g]):
+                    occupants.setdefault((d, t), []).append((g, k, s))
+        self._add_constrs(
             (
-                gp.quicksum(x[g, t] for t in range(T_star)) == 1
-                for g in range(num_groups)
+                gp.quicksum(z[key] for key in occupants[d, t]) <= 1
+                for (d, t) in occupants
             ),
-            name="single_start",
+            name="table_capacity",
         )
-        self.model.addConstrs(
+        return {"z": z}
+
+    def _build_symmetry(self, testcase):
+        """Order the load of interchangeable tables and the starts of identical groups.
+
+        See ``Symmetry``. The load of a table is the number of periods it
+        is occupied. For identical groups ``g < h``, ``h`` may only have
+        started by ``t`` if ``g`` has, for every ``t``. The orderings are
+        expressed on b and x, or on z in column mode, so they work with
+        either builder.
+        """
+        P = testcase.Pg
+        symmetry = Symmetry(testcase)
+
+        num_tables = int(len(testcase.Md))
+        load = {d: gp.LinExpr() for d in range(num_tables)}
+        started = {}
+        if "z" in self.solution:
+            for (g, k, s), var in self.solution["z"].items():
+                for d in self.columns[g][k]:
+                    load[d].addTerms(P[g], var)
+                started.setdefault(g, {}).setdefault(s, []).append(var)
+        else:
+            for (g, d), var in self.solution["b"].items():
+                load[d].addTerms(P[g], var)
+            for (g, t), var in self.solution["x"].items():
+                started.setdefault(g, {}).setdefault(t, []).append(var)
+
+        # started_by[g, t]: 1 if group g starts at or before t, accumulated
+        # one period at a time so each row holds only that period's starts
+        steps = [
+            (g, t, previous)
+            for groups in symmetry.group_classes
+            for g in groups
+            for previous, t in zip(
+                [None] + sorted(started.get(g, {})), sorted(started.get(g, {}))
+            )
+        ]
+        started_by = self._add_vars(
+            [(g, t) for g, t, _ in steps], lb=0, ub=1, name="started_by"
+        )
+        self._add_constrs(
             (
-                a[g, d, t] <= 0
-                for g in range(num_groups)
-                for d in range(num_tables)
-                for t in range(len(O[d]))
-                if O[d, t] == 1
+                started_by[g, t]
+                == gp.quicksum(started[g][t])
+                + (started_by[g, previous] if previous is not None else 0)
+                for g, t, previous in steps
             ),
-            name="table_unavailability",
+            name="started_by",
         )
 
-        # Optimize the model
-        self.model.optimize()
+        table_pairs = [(i, j) for i, orbit in symmetry.table_orbits for j in orbit]
+        group_pairs = [
+            (g, h, t)
+            for groups in symmetry.group_classes
+            for g, h in zip(groups, groups[1:])
+            for t in sorted(started.get(h, {}))
+            if (g, t) in started_by
+        ]
+        self._add_constrs(
+            (load[i] >= load[j] for (i, j) in table_pairs), name="table_order"
+        )
+        self._add_constrs(
+            (started_by[h, t] <= started_by[g, t] for (g, h, t) in group_pairs),
+            name="group_order",
+        )
+        print(
+            f"Symmetry: {len(table_pairs)} table orderings, "
+            f"{len(group_pairs)} group orderings"
+        )
+
+    @property
+    def status(self):
+        """Status name of the last solve, as reported by ``CPSolver`` too."""
+        if self.cached is not None:
+            return self.cached["status"]
+        if self.model is None:
+            return None
+        names = {GRB.OPTIMAL: "OPTIMAL", GRB.INFEASIBLE: "INFEASIBLE"}
+        if self.model.Status in names:
+            return names[self.model.Status]
+        return "FEASIBLE" if self.model.SolCount > 0 else "UNKNOWN"
+
+    @property
+    def objective(self):
+        if self.cached is not None:
+            return self.cached["objective"]
+        if self.model is None or self.model.SolCount == 0:
+            return None
+        return self.model.ObjVal
 
-        # Store the solution
-        self.solution = {"a": a, "b": b, "x": x, "c": c}
-        
-        # write results to file
-        with open("gurobi.txt", "w") as f:
-            f.write("Objective Value: " + str(self.model.ObjVal) + "\n")
+    @property
+    def gap(self):
+        if self.cached is not None:
+            return self.cached["gap"]
+        if self.model is None or self.model.SolCount == 0:
+            return None
+        return self.model.MIPGap
 
     def report(self):
-        if self.model.status == GRB.OPTIMAL:
+        if self.cached is not None:
+            print(f"Cached result: {self.status}, objective {self.objective}")
+        elif self.model.status == GRB.OPTIMAL:
             print("Optimal solution found")
             for v in self.model.getVars():
                 if v.x > 0.0001:  # Only print non-zero variables
@@ -203,102 +826,64 @@ class Solver:
         else:
             print("No optimal solution found")
 
-    def to_solution(self, testcase):
-        N = testcase.Ng
-        M = testcase.Md
-        C = testcase.Cij
-        P = testcase.Pg
-        U = testcase.Ug
-        S = testcase.Sg
-        H = testcase.Hg
-        O = testcase.Odt
-        alpha = testcase.alpha
-
-        num_groups = int(len(N))
-        num_tables = int(len(M))
-        T_star = int(max(U) + max(P)) * num_groups
-
-        if self.model.status == GRB.OPTIMAL:
-            solution = {
-                "a": np.array(
-                    [
-                        [
-                            [self.solution["a"][g, d, t].x for t in range(T_star)]
-                            for d in range(num_tables)
-                        ]
-                        for g in range(num_groups)
-                    ]
-                ),
-                "b": np.array(
-                    [
-                        [self.solution["b"][g, d].x for d in range(num_tables)]
-                        for g in range(num_groups)
-                    ]
-                ),
-                "x": np.array(
-                    [
-                        [self.solution["x"][g, t].x for t in range(T_star)]
-                        for g in range(num_groups)
-                    ]
-                ),
-                "c": np.array(
-                    [
-                        [
-                            [[self.solution["c"][g, i, j].x for j in range(num_tables)]]
-                            for i in range(num_tables)
-                        ]
-                        for g in range(num_groups)
-                    ]
-                ),
-            }
-            return solution
-        else:
-            return None
-
-    def draw_solution(self, solution):
-        x = solution["x"]
-        a = solution["a"]
-        b = solution["b"]
-        num_groups = len(x)
-        num_tables = len(b[0])
-        T_star = len(x[0])
+    def _values(self, name):
+        """Query X for a whole variable family at once; return keys and values."""
+        values = self.model.getAttr("X", self.solution[name])
+        keys = np.array(list(values.keys()), dtype=int)
+        return keys, np.fromiter(values.values(), dtype=float, count=len(values))
 
-        fig, gnt = plt.subplots()
+    def to_solution(self, testcase, sparse=False):
+        """Return the dense ``a``/``b``/``x``/``c`` arrays, or a ``Schedule``.
 
-        gnt.set_xlabel("Time")
-        gnt.set_ylabel("Tables")
-
-        gnt.set_xticks(np.arange(0, T_star, step=1))
-        gnt.set_yticks(np.arange(0, num_tables, step=1))
-        gnt.set_xticklabels(np.arange(0, T_star, step=1))
-        gnt.set_yticklabels(np.arange(0, num_tables, step=1))
+        With ``sparse=True`` only the start time and table list of each
+        group are returned, without materialising G x D x T arrays.
+        """
+        P = testcase.Pg
 
-        gnt.grid(True)
+        num_groups = int(len(testcase.Ng))
+        num_tables = int(len(testcase.Md))
 
-        colors = plt.cm.get_cmap("tab20", num_groups)
+        if self._cached_schedule is not None:
+            schedule = self._cached_schedule
+            return schedule if sparse else schedule.to_solution()
+        if self.model.SolCount == 0:
+            return None
 
-        for g in range(num_groups):
-            for d in range(num_tables):
-                for t in range(T_star):
-                    if a[g, d, t] > 0.5:
-                        gnt.broken_barh([(t, 1)], (d - 0.4, 0.8), facecolors=colors(g))
+        with self.telemetry.phase("extract"):
+            starts = np.full(num_groups, -1)
+            tables = [[] for _ in range(num_groups)]
+            if "z" in self.solution:
+                keys, values = self._values("z")
+                for g, k, s in keys[values > 0.5]:
+                    starts[g] = s
+                    tables[g] = list(self.columns[g][k])
+            else:
+                keys, values = self._values("x")
+                chosen = keys[values > 0.5]
+                starts[chosen[:, 0]] = chosen[:, 1]
+                keys, values = self._values("b")
+                for g, d in keys[values > 0.5]:
+                    tables[g].append(d)
 
-        # Add legend
-        legend_elements = [
-            Patch(facecolor=colors(g), label=f"Group {g+1}") for g in range(num_groups)
-        ]
-        gnt.legend(handles=legend_elements)
+            schedule = Schedule(starts, tables, P, num_tables, self.horizon)
+            return schedule if sparse else schedule.to_solution()
 
-        plt.savefig("gurobi.png")  # Save the figure before displaying it
-        plt.show()
+    def draw_solution(self, solution, formats=("png",)):
+        """Save the Gantt chart of a dense solution or ``Schedule`` as ``gurobi.<format>``."""
+        with self.telemetry.phase("draw"):
+            Renderer(self.output_dir, formats).draw_solution(solution, "gurobi")
 
 
 if __name__ == "__main__":
+    # Phase timings and solver progress go to telemetry.jsonl
+    telemetry = Telemetry("telemetry.jsonl")
+
     # Load data from CSV and create Testcase object
-    testcase = Testcase.from_csv("testcase_data.csv")
+    with telemetry.phase("load"):
+        testcase = Testcase.from_csv("testcase_data.csv")
 
     # Solve the testcase
-    solver = Solver()
+    solver = Solver(telemetry=telemetry)
     solver.solve(testcase)
     solver.report()
     solution = solver.to_solution(testcase)
@@ -306,3 +891,4 @@ if __name__ == "__main__":
         solver.draw_solution(solution)
     else:
         print("No solution found")
+    telemetry.close()
@@ -0,0 +1,88 @@
+import numpy as np
+
+
+class Symmetry:
+    """Interchangeable tables and groups of a testcase.
+
+    Two tables are interchangeable when some relabelling of the floor plan
+    maps one onto the other and keeps every seat count, adjacency and
+    blocked interval. ``table_orbits`` lists, for each table ``i``, the
+    tables ``j > i`` it can be swapped with while tables ``0 .. i-1`` stay
+    put; any optimal plan can be relabelled so that table ``i`` carries at
+    least as much load as each of them (Schreier-Sims ordering).
+
+    Groups with equal (N, P, U, S, H) are interchangeable outright and are
+    collected in ``group_classes``; any plan can be relabelled so that their
+    start times do not decrease with the group index.
+
+    Table and group relabellings commute and neither changes what the
+    other orders on, so both orderings can be imposed together.
+    """
+
+    def __init__(self, testcase, max_nodes=100000):
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.table_orbits = self._table_orbits(testcase)
+        self.group_classes = self._group_classes(testcase)
+
+    def __bool__(self):
+        return bool(self.table_orbits or self.group_classes)
+
+    def _table_orbits(self, testcase):
+        C = np.asarray(testcase.Cij) == 1
+        num_tables = len(testcase.Md)
+        self.adjacent = [
+            frozenset(j for j in np.flatnonzero(C[i]) if j != i)
+            for i in range(num_tables)
+        ]
+        # Tables can only map to tables with the same colour
+        self.color = [
+            (int(testcase.Md[d]), tuple(testcase.blocked[d]), len(self.adjacent[d]))
+            for d in range(num_tables)
+        ]
+
+        orbits = []
+        for i in range(num_tables):
+            fixed = {d: d for d in range(i)}
+            orbit = [
+                j
+                for j in range(i + 1, num_tables)
+                if self.color[j] == self.color[i]
+                and self._extend({**fixed, i: j}) is not None
+            ]
+            if orbit:
+                orbits.append((i, orbit))
+        return orbits
+
+    def _extend(self, mapping):
+        """Complete a partial table relabelling to an automorphism, or return None."""
+        for d, e in mapping.items():
+            for k, f in mapping.items():
+                if (k in self.adjacent[d]) != (f in self.adjacent[e]):
+                    return None
+        used = set(mapping.values())
+        if len(used) != len(mapping):
+            return None
+        free = [d for d in range(len(self.color)) if d not in mapping]
+        if not free:
+            return mapping
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            return None  # give up: missing an orbit only weakens the ordering
+        d = free[0]
+        for e in range(len(self.color)):
+            if e in used or self.color[e] != self.color[d]:
+                continue
+            result = self._extend({**mapping, d: e})
+            if result is not None:
+                return result
+        return None
+
+    @staticmethod
+    def _group_classes(testcase):
+        profiles = {}
+        for g, profile in enumerate(
+            zip(testcase.Ng, testcase.Pg, testcase.Ug, testcase.Sg, testcase.Hg)
+        ):
+            profiles.setdefault(tuple(int(v) for v in profile), []).append(g)
+        return [groups for groups in profiles.values() if len(groups) > 1]
@@ -0,0 +1,88 @@
+import contextlib
+import json
+import time
+
+
+class Telemetry:
+    """Phase timings and solver progress, recorded as JSON lines.
+
+    Every record is a dict with an ``event`` name and ``time``, the seconds
+    since the telemetry was created. Records are kept in ``records`` and, if
+    ``filename`` is given, appended to that file one JSON object per line as
+    they happen, so a slow run can be inspected while it is still going.
+    """
+
+    def __init__(self, filename=None):
+        self.records = []
+        self.started = time.perf_counter()
+        self._file = open(filename, "a") if filename is not None else None
+        self._best = None
+        self._bound = None
+
+    def emit(self, event, **fields):
+        record = {"event": event, "time": time.perf_counter() - self.started}
+        record.update(fields)
+        self.records.append(record)
+        if self._file is not None:
+            self._file.write(json.dumps(record, default=_plain) + "\n")
+            self._file.flush()
+        return record
+
+    @contextlib.contextmanager
+    def phase(self, name, **fields):
+        """Time the enclosed block and emit a ``phase`` record for it."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.emit(
+                "phase", name=name, seconds=time.perf_counter() - started, **fields
+            )
+
+    def gurobi_progress(self, model, where):
+        """Gurobi callback body: record the incumbent and bound whenever they move."""
+        # Imported here so that telemetry of the other backends needs no gurobipy
+        from gurobipy import GRB
+
+        if where == GRB.Callback.MIPSOL:
+            self.emit(
+                "incumbent",
+                objective=model.cbGet(GRB.Callback.MIPSOL_OBJ),
+                runtime=model.cbGet(GRB.Callback.RUNTIME),
+                nodes=model.cbGet(GRB.Callback.MIPSOL_NODCNT),
+            )
+        elif where == GRB.Callback.MIP:
+            best = model.cbGet(GRB.Callback.MIP_OBJBST)
+            bound = model.cbGet(GRB.Callback.MIP_OBJBND)
+            if (best, bound) != (self._best, self._bound):
+                self._best, self._bound = best, bound
+                self.emit(
+                    "progress",
+                    incumbent=best if best < GRB.INFINITY else None,
+                    bound=bound if bound > -GRB.INFINITY else None,
+                    runtime=model.cbGet(GRB.Callback.RUNTIME),
+                    nodes=model.cbGet(GRB.Callback.MIP_NODCNT),
+                )
+
+    def totals(self):
+        """Seconds spent per phase, summed over repeated phases."""
+        totals = {}
+        for record in self.records:
+            if record["event"] == "phase":
+                key = record["name"]
+                if "family" in record:
+                    key = f"{key}:{record['family']}"
+                totals[key] = totals.get(key, 0.0) + record["seconds"]
+        return totals
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _plain(value):
+    """JSON fallback for numpy scalars and arrays."""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
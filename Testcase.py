@@ -1,10 +1,24 @@
 import csv
-import random
 import numpy as np
+from Presolve import Presolve
 
 
 class Testcase:
-    def __init__(self, Ng, Md, Cij, Pg, Ug, Sg, Hg, Odt, alpha):
+    """Problem data for one seating instance.
+
+    Table unavailability can be given either as the dense tables x periods
+    matrix ``Odt`` or as ``blocked``: one sorted list of half-open
+    ``(start, end)`` intervals per table, together with ``horizon``, the
+    number of periods covered. Both views are available as attributes; the
+    one that was not supplied is derived on first access.
+
+    The generators take an optional ``seed``; the same seed always gives
+    the same instance.
+    """
+
+    def __init__(
+        self, Ng, Md, Cij, Pg, Ug, Sg, Hg, Odt, alpha, blocked=None, horizon=None
+    ):
         self.Ng = Ng
         self.Md = Md
         self.Cij = Cij
@@ -12,9 +26,40 @@ class Testcase:
         self.Ug = Ug
         self.Sg = Sg
         self.Hg = Hg
-        self.Odt = Odt
+        if Odt is not None:
+            self.Odt = Odt
+        else:
+            if blocked is None or horizon is None:
+                raise ValueError("Either Odt or blocked and horizon must be given")
+            self._Odt = None
+            self._blocked = [_merge(intervals) for intervals in blocked]
+            self.horizon = int(horizon)
         self.alpha = alpha
 
+    @property
+    def Odt(self):
+        """Dense tables x periods 0/1 view of the unavailability."""
+        if self._Odt is None:
+            self._Odt = _dense(self._blocked, self.horizon)
+        return self._Odt
+
+    @Odt.setter
+    def Odt(self, Odt):
+        self._Odt = Odt
+        self._blocked = None
+        self.horizon = int(np.shape(Odt)[1]) if np.ndim(Odt) == 2 else 0
+
+    @property
+    def blocked(self):
+        """Per-table sorted lists of blocked ``(start, end)`` intervals."""
+        if self._blocked is None:
+            self._blocked = _intervals(self._Odt, len(self.Md))
+        return self._blocked
+
+    def presolve(self, horizon=None):
+        """Per-group usable tables, start bounds and infeasibilities; see ``Presolve``."""
+        return Presolve(self, horizon)
+
     @staticmethod
     def generate_data(
         number_people,
@@ -24,29 +69,32 @@ class Testcase:
         max_duration,
         max_wait,
         max_tables,
+        seed=None,
     ):
-        Ng = np.random.randint(1, number_people, num_groups)
-        Md = np.random.randint(2, max_seats + 1, num_tables)
-        Cij_upper = np.triu(np.random.randint(0, 2, (num_tables, num_tables)))
+        rng = np.random.default_rng(seed)
+        Ng = rng.integers(1, number_people, num_groups)
+        Md = rng.integers(2, max_seats + 1, num_tables)
+        Cij_upper = np.triu(rng.integers(0, 2, (num_tables, num_tables)))
         Cij = Cij_upper + Cij_upper.T - np.diag(Cij_upper.diagonal())
         for i in range(num_tables):
             Cij[i, i] = 1
 
-        Pg = np.random.randint(1, max_duration + 1, num_groups)
-        Ug = np.random.randint(max_duration, max_wait + 1, num_groups)
-        Sg = np.random.randint(0, max_duration / 2 + 1, num_groups)
-        Hg = np.random.randint(max_tables, max_tables + 1, num_groups)
-        Odt = np.random.randint(
-            0, 2, (num_tables, (max_duration + max_wait) * num_groups)
-        )
-        Odt = np.random.choice(
-            [0, 1],
-            size=(num_tables, (max_duration + max_wait) * num_groups),
-            p=[0.9, 0.1],
-        )
-        alpha = random.uniform(0, 1)
+        Pg = rng.integers(1, max_duration + 1, num_groups)
+        Ug = rng.integers(max_duration, max_wait + 1, num_groups)
+        Sg = rng.integers(0, max_duration // 2 + 1, num_groups)
+        Hg = rng.integers(max_tables, max_tables + 1, num_groups)
+        # About 10% of the periods of each table are blocked
+        horizon = (max_duration + max_wait) * num_groups
+        blocked = []
+        for _ in range(num_tables):
+            count = rng.binomial(horizon, 0.1)
+            periods = np.unique(rng.integers(0, horizon, count))
+            blocked.append([(t, t + 1) for t in periods])
+        alpha = rng.uniform(0, 1)
 
-        return Testcase(Ng, Md, Cij, Pg, Ug, Sg, Hg, Odt, alpha)
+        return Testcase(
+            Ng, Md, Cij, Pg, Ug, Sg, Hg, None, alpha, blocked=blocked, horizon=horizon
+        )
 
     def save_to_csv(self, filename):
         data = {
@@ -84,9 +132,100 @@ class Testcase:
 
         return Testcase(Ng, Md, Cij, Pg, Ug, Sg, Hg, Odt, alpha)
 
-    def dapu(number_people, num_groups):
-        Ng = np.random.randint(1, number_people, num_groups)  # 1~4
-        Md = np.random.randint(1, 1 + 1, 10)  # 1
+    def save(self, filename):
+        """Save as an ``.npz`` with compact integer arrays.
+
+        Unavailability is stored as the blocked intervals of all tables
+        flattened into ``blocked_starts`` and ``blocked_ends``, with table
+        ``d`` owning entries ``blocked_offsets[d]:blocked_offsets[d + 1]``,
+        so the file grows with the number of blocked periods rather than
+        with the horizon. The symmetric ``Cij`` is stored as ``edges``, the
+        ``(i, j)`` pairs with ``i <= j`` that can be combined.
+        """
+        blocked = self.blocked
+        counts = [len(intervals) for intervals in blocked]
+        intervals = np.array(
+            [interval for table in blocked for interval in table], dtype=np.int64
+        ).reshape(-1, 2)
+        np.savez(
+            filename,
+            Ng=_small_int(self.Ng),
+            Md=_small_int(self.Md),
+            edges=_small_int(np.argwhere(np.triu(np.asarray(self.Cij) == 1))),
+            Pg=_small_int(self.Pg),
+            Ug=_small_int(self.Ug),
+            Sg=_small_int(self.Sg),
+            Hg=_small_int(self.Hg),
+            blocked_starts=_small_int(intervals[:, 0]),
+            blocked_ends=_small_int(intervals[:, 1]),
+            blocked_offsets=_small_int(np.concatenate([[0], np.cumsum(counts)])),
+            horizon=np.int64(self.horizon),
+            alpha=np.float64(self.alpha),
+        )
+
+    @staticmethod
+    def load(filename):
+        """Load a testcase written by ``save``; ``Odt`` is only built when accessed."""
+        with np.load(filename) as data:
+            arrays = {
+                key: data[key].astype(int)
+                for key in ("Ng", "Md", "Pg", "Ug", "Sg", "Hg")
+            }
+            alpha = float(data["alpha"])
+            if "Cij" in data.files:
+                arrays["Cij"] = data["Cij"].astype(int)
+            else:
+                num_tables = len(arrays["Md"])
+                i, j = data["edges"].astype(int).reshape(-1, 2).T
+                arrays["Cij"] = np.zeros((num_tables, num_tables), dtype=int)
+                arrays["Cij"][i, j] = arrays["Cij"][j, i] = 1
+            if "Odt" in data.files:
+                # Written before intervals and edges were stored
+                Odt, blocked, horizon = data["Odt"].astype(int), None, None
+            else:
+                Odt = None
+                horizon = int(data["horizon"])
+                split = data["blocked_offsets"].astype(int)[1:-1]
+                blocked = [
+                    list(zip(starts.tolist(), ends.tolist()))
+                    for starts, ends in zip(
+                        np.split(data["blocked_starts"].astype(int), split),
+                        np.split(data["blocked_ends"].astype(int), split),
+                    )
+                ]
+
+        return Testcase(
+            arrays["Ng"],
+            arrays["Md"],
+            arrays["Cij"],
+            arrays["Pg"],
+            arrays["Ug"],
+            arrays["Sg"],
+            arrays["Hg"],
+            Odt,
+            alpha,
+            blocked=blocked,
+            horizon=horizon,
+        )
+
+    @staticmethod
+    def convert(source, target):
+        """Convert between ``.csv`` and ``.npz`` based on the file extensions."""
+        if str(source).endswith(".npz"):
+            testcase = Testcase.load(source)
+        else:
+            testcase = Testcase.from_csv(source)
+        if str(target).endswith(".npz"):
+            testcase.save(target)
+        else:
+            testcase.save_to_csv(target)
+        return testcase
+
+    @staticmethod
+    def dapu(number_people, num_groups, seed=None):
+        rng = np.random.default_rng(seed)
+        Ng = rng.integers(1, number_people, num_groups)  # 1~4
+        Md = rng.integers(1, 1 + 1, 10)  # 1
         Cij = np.zeros((10, 10), dtype=int)
         for i in range(10):
             Cij[i, i] = 1
@@ -94,22 +233,35 @@ class Testcase:
             Cij[i, i + 1] = 1
             Cij[i + 1, i] = 1
 
-        Pg = np.random.randint(5, 6 + 1, num_groups)  # 5~6
-        Ug = np.random.randint(7, 12 + 1, num_groups)  # 7~12
-        Sg = np.random.randint(0, 6 + 1, num_groups)  # 0~6
-        Hg = np.random.randint(10, 10 + 1, num_groups)  # 10
-        Odt = np.zeros((10, 12 * num_groups))
+        Pg = rng.integers(5, 6 + 1, num_groups)  # 5~6
+        Ug = rng.integers(7, 12 + 1, num_groups)  # 7~12
+        Sg = rng.integers(0, 6 + 1, num_groups)  # 0~6
+        Hg = rng.integers(10, 10 + 1, num_groups)  # 10
+        blocked = []
         for i in range(10):
-            num_occ = random.randint(0, 6)
-            for j in range(num_occ):
-                Odt[i, j] = 1
+            num_occ = rng.integers(0, 6 + 1)
+            blocked.append([(0, num_occ)] if num_occ > 0 else [])
         alpha = 0.1
 
-        return Testcase(Ng, Md, Cij, Pg, Ug, Sg, Hg, Odt, alpha)
+        return Testcase(
+            Ng,
+            Md,
+            Cij,
+            Pg,
+            Ug,
+            Sg,
+            Hg,
+            None,
+            alpha,
+            blocked=blocked,
+            horizon=12 * num_groups,
+        )
 
-    def hantiange(number_people, num_groups, max_duration, max_wait):
+    @staticmethod
+    def hantiange(number_people, num_groups, max_duration, max_wait, seed=None):
+        rng = np.random.default_rng(seed)
         num_tables = 12
-        Ng = np.random.randint(1, number_people, num_groups)
+        Ng = rng.integers(1, number_people, num_groups)
         Md = np.zeros(num_tables, dtype=int)
         Md[0] = 4
         Md[1] = 4
@@ -145,23 +297,37 @@ class Testcase:
         Cij[10, 9] = 1
         Cij[10, 11] = 1
         Cij[11, 10] = 1
-        Pg = np.random.randint(max_duration - 1, max_duration + 1, num_groups)
-        Ug = np.random.randint(max_duration, max_wait + 1, num_groups)
-        Sg = np.random.randint(0, max_wait / 2 + 1, num_groups)
-        Hg = np.random.randint(10, 10 + 1, num_groups)
-        Odt = np.zeros((num_tables, max_duration * num_groups))
+        Pg = rng.integers(max_duration - 1, max_duration + 1, num_groups)
+        Ug = rng.integers(max_duration, max_wait + 1, num_groups)
+        Sg = rng.integers(0, max_wait // 2 + 1, num_groups)
+        Hg = rng.integers(10, 10 + 1, num_groups)
+        blocked = [[] for _ in range(num_tables)]
         # for i in range(num_tables):
-            # num_occ = random.randint(0, max_duration)
-            # for j in range(num_occ):
-            #     Odt[i, j] = 1
+        #     num_occ = rng.integers(0, max_duration + 1)
+        #     if num_occ > 0:
+        #         blocked[i].append((0, num_occ))
         alpha = 0.1
 
-        return Testcase(Ng, Md, Cij, Pg, Ug, Sg, Hg, Odt, alpha)
+        return Testcase(
+            Ng,
+            Md,
+            Cij,
+            Pg,
+            Ug,
+            Sg,
+            Hg,
+            None,
+            alpha,
+            blocked=blocked,
+            horizon=max_duration * num_groups,
+        )
 
-    def sanma(number_people, num_groups, max_duration, max_wait):
+    @staticmethod
+    def sanma(number_people, num_groups, max_duration, max_wait, seed=None):
+        rng = np.random.default_rng(seed)
         max_seats = 4
         num_tables = 6
-        Ng = np.random.randint(1, number_people, num_groups)
+        Ng = rng.integers(1, number_people, num_groups)
         Md = np.zeros(num_tables, dtype=int)
         Md[0] = 4
         Md[1] = 4
@@ -191,17 +357,74 @@ class Testcase:
         Cij[4, 5] = 1
         Cij[5, 4] = 1
 
-        Pg = np.random.randint(1, max_duration + 1, num_groups)
-        Ug = np.random.randint(max_duration, max_wait + 1, num_groups)
-        Sg = np.random.randint(0, max_wait / 3 + 1, num_groups)
-        Hg = np.random.randint(10, 10 + 1, num_groups)
-        Odt = np.random.randint(0, 2, (num_tables, max_duration * num_groups))
-        Odt = np.random.choice(
-            [0, 1], size=(num_tables, max_duration * num_groups), p=[1, 0]
+        Pg = rng.integers(1, max_duration + 1, num_groups)
+        Ug = rng.integers(max_duration, max_wait + 1, num_groups)
+        Sg = rng.integers(0, max_wait // 3 + 1, num_groups)
+        Hg = rng.integers(10, 10 + 1, num_groups)
+        # No table is blocked in advance
+        blocked = [[] for _ in range(num_tables)]
+        alpha = rng.uniform(0, 1)
+
+        return Testcase(
+            Ng,
+            Md,
+            Cij,
+            Pg,
+            Ug,
+            Sg,
+            Hg,
+            None,
+            alpha,
+            blocked=blocked,
+            horizon=max_duration * num_groups,
         )
-        alpha = random.uniform(0, 1)
 
-        return Testcase(Ng, Md, Cij, Pg, Ug, Sg, Hg, Odt, alpha)
+
+def _merge(intervals):
+    """Sort intervals and merge the ones that overlap or touch."""
+    merged = []
+    for start, end in sorted((int(s), int(e)) for s, e in intervals):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _intervals(Odt, num_tables):
+    """Return the blocked intervals of each row of a dense 0/1 matrix."""
+    O = np.asarray(Odt)
+    if O.ndim != 2:
+        return [[] for _ in range(num_tables)]
+    # +1 where a blocked run starts, -1 just past where it ends
+    edges = np.diff(np.pad(O == 1, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)[1]
+    blocked = [[] for _ in range(num_tables)]
+    for d, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist()):
+        blocked[d].append((start, end))
+    return blocked
+
+
+def _dense(blocked, horizon):
+    """Expand per-table intervals into a tables x ``horizon`` 0/1 matrix."""
+    Odt = np.zeros((len(blocked), horizon), dtype=int)
+    for d, intervals in enumerate(blocked):
+        for start, end in intervals:
+            Odt[d, start:end] = 1
+    return Odt
+
+
+def _small_int(values):
+    """Return ``values`` in the smallest integer dtype that holds them."""
+    values = np.asarray(values)
+    if values.size == 0:
+        return values.astype(np.uint8)
+    low, high = int(values.min()), int(values.max())
+    dtype = np.promote_types(np.min_scalar_type(low), np.min_scalar_type(high))
+    return values.astype(dtype)
 
 
 if __name__ == "__main__":
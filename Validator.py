@@ -0,0 +1,204 @@
+import numpy as np
+
+from Schedule import Schedule
+
+
+class Validator:
+    """Vectorised feasibility check and objective of a seating plan.
+
+    ``check`` takes a ``Schedule``, a dense G x D x T allocation (or a
+    solution dict holding one under ``"a"``) or a ``(starts, tables)`` pair
+    and returns ``{check: [groups]}`` for every check that fails:
+
+    - ``"unseated"``: the group has no start time.
+    - ``"seats"``: its tables seat fewer than ``Ng`` people.
+    - ``"tables"``: it uses more than ``Hg`` tables.
+    - ``"duration"``: it does not stay exactly ``Pg`` periods.
+    - ``"contiguity"``: (dense input only) its periods are not one run, or
+      its tables are not all held over the same periods.
+    - ``"wait"``: it starts after ``Ug - Sg``.
+    - ``"blocked"``: one of its tables is blocked during its meal.
+    - ``"overlap"``: it shares a table with another group at the same time.
+    - ``"connectivity"``: its tables are not connected through ``Cij``.
+
+    Checks named in ``ignore`` are skipped; FCFS and LNS ignore ``"wait"``.
+    Everything is computed over arrays of stints, so one call costs a few
+    NumPy passes and is cheap enough to run on every local-search candidate.
+    """
+
+    CHECKS = (
+        "unseated",
+        "seats",
+        "tables",
+        "duration",
+        "contiguity",
+        "wait",
+        "blocked",
+        "overlap",
+        "connectivity",
+    )
+
+    def __init__(self, testcase, ignore=()):
+        unknown = set(ignore) - set(self.CHECKS)
+        if unknown:
+            raise ValueError(f"Unknown checks {sorted(unknown)}")
+        self.ignore = frozenset(ignore)
+        self.N = np.asarray(testcase.Ng)
+        self.M = np.asarray(testcase.Md)
+        self.C = np.asarray(testcase.Cij) == 1
+        self.P = np.asarray(testcase.Pg)
+        self.S = np.asarray(testcase.Sg)
+        self.H = np.asarray(testcase.Hg)
+        self.latest = np.asarray(testcase.Ug) - self.S
+        self.alpha = testcase.alpha
+        # Blocked intervals of all tables, sorted by ``d * (horizon + 1) + end``
+        # and closed by a sentinel past the last table; they are disjoint, so
+        # ends rise with starts. Periods past the testcase horizon are free
+        self.horizon = int(testcase.horizon)
+        span = self.horizon + 1
+        within = [
+            [(start, end) for start, end in blocked if start < self.horizon]
+            for blocked in testcase.blocked
+        ]
+        counts = [len(intervals) for intervals in within] + [1]
+        intervals = np.array(
+            [interval for blocked in within for interval in blocked] + [(span, span)],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        self.blocked_starts = intervals[:, 0]
+        self.blocked_keys = np.repeat(
+            np.arange(len(counts), dtype=np.int64) * span, counts
+        ) + np.minimum(intervals[:, 1], self.horizon)
+        # Table subsets already known to be (dis)connected
+        self._connected = {}
+
+    def schedule(self, solution):
+        """Return ``solution`` as a ``Schedule`` and the groups that are not contiguous."""
+        if isinstance(solution, Schedule):
+            return solution, np.zeros(len(solution), dtype=bool)
+        if isinstance(solution, tuple):
+            starts, tables = solution
+            horizon = max(
+                [self.horizon] + [s + p for s, p in zip(starts, self.P) if s >= 0]
+            )
+            schedule = Schedule(starts, tables, self.P, len(self.M), horizon)
+            return schedule, np.zeros(len(schedule), dtype=bool)
+        if isinstance(solution, dict):
+            solution = solution["a"]
+        a = np.asarray(solution) > 0.5
+        schedule = Schedule.from_allocation(a)
+        busy = a.any(axis=1)
+        used = a.any(axis=2)
+        # One run of busy periods, held on every table the group uses
+        runs = np.count_nonzero(np.diff(busy.astype(np.int8), axis=1) == 1, axis=1)
+        runs += busy[:, 0]
+        ragged = (a != (used[:, :, None] & busy[:, None, :])).any(axis=(1, 2))
+        return schedule, (runs > 1) | ragged
+
+    def check(self, solution):
+        """Return ``{check: sorted groups}`` for every failed check; empty if feasible."""
+        schedule, split = self.schedule(solution)
+        seated = schedule.starts >= 0
+        sizes = np.array([len(tables) for tables in schedule.tables], dtype=int)
+        failed = {
+            "unseated": ~seated,
+            "tables": seated & (sizes > self.H),
+            "duration": seated & (schedule.durations != self.P),
+            "contiguity": split,
+            "wait": seated & (schedule.starts > self.latest),
+        }
+
+        # One row per (group, table) stint
+        groups = np.repeat(np.arange(len(schedule)), sizes)
+        tables = np.fromiter(
+            (d for ts in schedule.tables for d in ts), dtype=int, count=len(groups)
+        )
+        keep = seated[groups]
+        groups, tables = groups[keep], tables[keep]
+        starts = schedule.starts[groups]
+        ends = starts + schedule.durations[groups]
+
+        seats = np.bincount(groups, weights=self.M[tables], minlength=len(schedule))
+        failed["seats"] = seated & (seats < self.N)
+
+        # A meal is blocked if the first interval ending after it starts,
+        # when that interval is on its own table, starts before it ends
+        offsets = tables * (self.horizon + 1)
+        first = np.searchsorted(
+            self.blocked_keys, offsets + np.clip(starts, 0, self.horizon), "right"
+        )
+        hit = (self.blocked_keys[first] <= offsets + self.horizon) & (
+            self.blocked_starts[first] < ends
+        )
+        failed["blocked"] = np.bincount(groups[hit], minlength=len(schedule)) > 0
+
+        # Sorted by table then start, a stint clashes when it starts before
+        # the latest end of the earlier stints on its table. Ends are keyed
+        # by ``table * span`` so the running maximum restarts on each table
+        order = np.lexsort((starts, tables))
+        span = int(ends.max(initial=0)) + 1
+        keys = tables[order] * span + ends[order]
+        latest = np.maximum.accumulate(keys)
+        # Position in ``order`` of the stint holding each running maximum
+        holder = np.maximum.accumulate(
+            np.where(keys == latest, np.arange(len(keys)), 0)
+        )
+        clash = latest[:-1] > tables[order][1:] * span + starts[order][1:]
+        clashing = np.concatenate([order[1:][clash], order[holder[:-1][clash]]])
+        failed["overlap"] = np.bincount(groups[clashing], minlength=len(schedule)) > 0
+
+        failed["connectivity"] = np.array(
+            [
+                seated[g] and len(ts) > 1 and not self.connected(ts)
+                for g, ts in enumerate(schedule.tables)
+            ],
+            dtype=bool,
+        )
+        return {
+            name: np.flatnonzero(failed[name]).tolist()
+            for name in self.CHECKS
+            if name not in self.ignore and failed[name].any()
+        }
+
+    def connected(self, tables):
+        """True if ``tables`` form one connected component of ``Cij``."""
+        key = tuple(sorted(tables))
+        if key not in self._connected:
+            adjacent = self.C[np.ix_(key, key)]
+            reached = np.zeros(len(key), dtype=bool)
+            reached[0] = True
+            for _ in range(len(key) - 1):
+                grown = reached | adjacent[reached].any(axis=0)
+                if (grown == reached).all():
+                    break
+                reached = grown
+            self._connected[key] = bool(reached.all())
+        return self._connected[key]
+
+    def waiting(self, schedule):
+        """Weighted wait ``Ng * (Sg + start)`` of each group; 0 for unseated groups."""
+        seated = schedule.starts >= 0
+        return np.where(seated, self.N * (self.S + schedule.starts), 0)
+
+    def penalty(self, schedule):
+        """Split penalty: the sum over groups of ``Hg`` minus the number of tables."""
+        sizes = np.array([len(tables) for tables in schedule.tables], dtype=int)
+        return np.sum(self.H - sizes)
+
+    def objective(self, solution):
+        """Total weighted wait minus ``alpha`` times the split penalty."""
+        schedule, _ = self.schedule(solution)
+        return float(
+            np.sum(self.waiting(schedule)) - self.alpha * self.penalty(schedule)
+        )
+
+
+if __name__ == "__main__":
+    from FCFS import FCFS
+    from Testcase import Testcase
+
+    testcase = Testcase.from_csv("testcase_data.csv")
+    a = FCFS().solve(testcase, report=False)
+    validator = Validator(testcase, ignore=("wait",))
+    print("Objective Value:", validator.objective(a))
+    print("Violations:", validator.check(a) or "none")
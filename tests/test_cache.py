@@ -0,0 +1,44 @@
+import numpy as np
+
+from Cache import Cache
+from Schedule import Schedule
+from Solver import Solver
+from Testcase import Testcase
+
+
+def test_key_is_stable_across_instances_and_views():
+    first = Testcase.dapu(4, 8, seed=1)
+    second = Testcase.dapu(4, 8, seed=1)
+    assert Cache.key(first, "fcfs") == Cache.key(second, "fcfs")
+    # The same unavailability given densely hashes like its intervals
+    fields = ("Ng", "Md", "Cij", "Pg", "Ug", "Sg", "Hg")
+    arrays = [getattr(first, name) for name in fields]
+    dense = Testcase(*arrays, first.Odt, first.alpha)
+    assert Cache.key(dense, "fcfs") == Cache.key(first, "fcfs")
+    assert Cache.key(Testcase.dapu(4, 8, seed=2), "fcfs") != Cache.key(first, "fcfs")
+    assert Cache.key(first, "gurobi") != Cache.key(first, "fcfs")
+
+
+def test_key_depends_on_solver_options():
+    testcase = Testcase.dapu(4, 8, seed=1)
+
+    def key(**options):
+        return Cache.key(testcase, "gurobi", Solver(**options)._cache_options())
+
+    assert key() == key()
+    assert key(warm_start=True) != key()
+    assert key(mode="start") != key()
+    # Column mode has no connectivity option to tell apart
+    assert key(mode="column", connectivity="lazy") == key(mode="column")
+
+
+def test_put_get_round_trip(tmp_path):
+    cache = Cache(tmp_path)
+    schedule = Schedule([0, -1, 4], [[1, 2], [], [0]], [3, 2, 5], 3, 12)
+    cache.put("entry", schedule, objective=1.5)
+    stored, meta = cache.get("entry")
+    assert np.array_equal(stored.starts, schedule.starts)
+    assert stored.tables == schedule.tables
+    assert np.array_equal(stored.durations, schedule.durations)
+    assert meta["objective"] == 1.5
+    assert cache.get("missing") is None
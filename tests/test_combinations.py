@@ -0,0 +1,39 @@
+import itertools
+
+import numpy as np
+
+from Combinations import TableCombinations
+from Testcase import Testcase
+from Validator import Validator
+
+
+def test_chain_subsets_are_connected_and_minimal():
+    # 2 - 4 - 2 - 6 in a row
+    Md = np.array([2, 4, 2, 6])
+    Cij = sum(np.eye(4, k=k, dtype=int) for k in (-1, 0, 1))
+    combinations = TableCombinations(Md, Cij)
+    assert combinations.feasible(4, 1) == [(1,), (3,)]
+    # (1, 3) has the seats but is not connected; (1, 2, 3) holds (2, 3)
+    assert combinations.feasible(7, 3) == [(2, 3), (0, 1, 2)]
+    assert combinations.feasible(7, 1) == []
+
+
+def test_matches_brute_force():
+    testcase = Testcase.generate_data(10, 1, 7, 4, 1, 1, 1, seed=4)
+    Md, Cij = testcase.Md, testcase.Cij
+    validator = Validator(testcase)
+    combinations = TableCombinations(Md, Cij)
+    for n, h in ((3, 1), (6, 2), (9, 3), (12, 4)):
+        fits = [
+            tables
+            for k in range(1, h + 1)
+            for tables in itertools.combinations(range(len(Md)), k)
+            if Md[list(tables)].sum() >= n
+            and (k == 1 or validator.connected(tables))
+        ]
+        minimal = {
+            tables
+            for tables in fits
+            if not any(set(other) < set(tables) for other in fits)
+        }
+        assert set(combinations.feasible(n, h)) == minimal
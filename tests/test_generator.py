@@ -0,0 +1,35 @@
+import numpy as np
+
+from CPSolver import CPSolver
+from Generator import FloorPlan, Generator
+from Testcase import Testcase
+from Validator import Validator
+
+
+def test_small_instance_is_feasible(tmp_path):
+    testcase = Generator(FloorPlan.grid(3, 4), 60, seed=3).generate()
+    solver = CPSolver(time_limit=5, output_dir=tmp_path)
+    solver.solve(testcase)
+    assert solver.status in ("OPTIMAL", "FEASIBLE")
+    assert Validator(testcase).check(solver.to_solution(testcase, sparse=True)) == {}
+
+
+def test_same_seed_same_instance():
+    first = Generator(FloorPlan.grid(3, 4), 30, seed=7).generate()
+    second = Generator(FloorPlan.grid(3, 4), 30, seed=7).generate()
+    for field in ("Ng", "Md", "Pg", "Ug", "Sg", "Hg"):
+        assert np.array_equal(getattr(first, field), getattr(second, field))
+    assert first.blocked == second.blocked
+
+
+def test_stream_round_trip(tmp_path):
+    generator = Generator(FloorPlan.grid(3, 4) + FloorPlan.booths(2), 40, seed=5)
+    path = next(generator.stream(tmp_path, 1))
+    # Instance 0 of the stream is drawn from the first child of the seed
+    child = np.random.SeedSequence(generator.seeds.entropy).spawn(1)[0]
+    testcase = generator.generate(np.random.default_rng(child))
+    loaded = Testcase.load(path)
+    for field in ("Ng", "Md", "Cij", "Pg", "Ug", "Sg", "Hg"):
+        assert np.array_equal(getattr(testcase, field), getattr(loaded, field))
+    assert loaded.blocked == testcase.blocked
+    assert loaded.horizon == testcase.horizon
@@ -0,0 +1,41 @@
+import numpy as np
+
+from Occupancy import Occupancy
+
+
+def test_earliest_start_skips_blocked_intervals():
+    occupancy = Occupancy.from_intervals([[(2, 4)], [(5, 6)]], 12)
+    assert occupancy.earliest_start([0], 2) == 0
+    assert occupancy.earliest_start([0], 3) == 4
+    assert occupancy.earliest_start([0, 1], 3) == 6
+    assert occupancy.earliest_start([0], 2, after=1) == 4
+    # Periods past the horizon count as occupied
+    assert occupancy.earliest_start([0, 1], 7) is None
+
+
+def test_book_and_is_free():
+    occupancy = Occupancy.from_intervals([[], []], 10)
+    occupancy.book([0, 1], 3, 4)
+    assert not occupancy.is_free([0], 6, 1)
+    assert occupancy.is_free([0, 1], 7, 3)
+    assert not occupancy.is_free([1], 8, 3)
+    assert occupancy.earliest_start([1], 3) == 0
+    assert occupancy.earliest_start([1], 4) is None
+    assert occupancy.to_intervals() == [[(3, 7)], [(3, 7)]]
+
+
+def test_copy_does_not_share_bookings():
+    occupancy = Occupancy.from_intervals([[(0, 2)]], 8)
+    copy = occupancy.copy()
+    copy.book([0], 4, 2)
+    assert occupancy.to_intervals() == [[(0, 2)]]
+    assert copy.to_intervals() == [[(0, 2), (4, 6)]]
+
+
+def test_array_round_trip():
+    Odt = np.zeros((3, 20), dtype=int)
+    Odt[0, 3:7] = 1
+    Odt[2, [0, 19]] = 1
+    occupancy = Occupancy.from_array(Odt)
+    assert np.array_equal(occupancy.to_array(), Odt)
+    assert occupancy.to_intervals() == [[(3, 7)], [], [(0, 1), (19, 20)]]
@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+from Solver import Solver
+from Testcase import Testcase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("instance", ["dapu/testcase_1", "dapu/testcase_2"])
+def test_modes_agree_on_stored_instance(instance, tmp_path):
+    testcase = Testcase.from_csv(os.path.join(ROOT, instance, "testcase.csv"))
+    objectives = {}
+    for mode in Solver.MODES:
+        # The default MIPFocus 3 spends seconds proving the big-M model optimal
+        solver = Solver(mode=mode, output_dir=tmp_path, params={"MIPFocus": 0})
+        solver.solve(testcase)
+        assert solver.status == "OPTIMAL"
+        assert solver.violations == {}
+        objectives[mode] = solver.objective
+    assert objectives["start"] == pytest.approx(objectives["assignment"])
+    assert objectives["column"] == pytest.approx(objectives["assignment"])
@@ -0,0 +1,40 @@
+import numpy as np
+
+from Testcase import Testcase
+
+
+def _assert_same(first, second):
+    for field in ("Ng", "Md", "Cij", "Pg", "Ug", "Sg", "Hg"):
+        assert np.array_equal(getattr(first, field), getattr(second, field))
+    assert first.blocked == second.blocked
+    assert first.horizon == second.horizon
+    assert first.alpha == second.alpha
+
+
+def test_save_load_round_trip(tmp_path):
+    testcase = Testcase.generate_data(6, 8, 5, 4, 4, 10, 2, seed=1)
+    testcase.save(tmp_path / "testcase.npz")
+    loaded = Testcase.load(tmp_path / "testcase.npz")
+    _assert_same(testcase, loaded)
+    # The dense view is derived from the intervals only on access
+    assert loaded._Odt is None
+    assert np.array_equal(loaded.Odt, testcase.Odt)
+
+
+def test_file_size_does_not_depend_on_horizon(tmp_path):
+    testcase = Testcase.dapu(4, 8, seed=2)
+    testcase.save(tmp_path / "short.npz")
+    testcase.horizon *= 100
+    testcase.save(tmp_path / "long.npz")
+    sizes = [(tmp_path / name).stat().st_size for name in ("short.npz", "long.npz")]
+    assert sizes[0] == sizes[1]
+
+
+def test_convert_csv_round_trip(tmp_path):
+    testcase = Testcase.dapu(4, 8, seed=3)
+    testcase.save_to_csv(tmp_path / "testcase.csv")
+    Testcase.convert(tmp_path / "testcase.csv", tmp_path / "testcase.npz")
+    _assert_same(
+        Testcase.from_csv(tmp_path / "testcase.csv"),
+        Testcase.load(tmp_path / "testcase.npz"),
+    )
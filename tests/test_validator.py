@@ -0,0 +1,45 @@
+import numpy as np
+
+from Testcase import Testcase
+from Validator import Validator
+
+
+def _testcase(num_groups=3, blocked=None, Pg=None):
+    """Groups of two on a row of three two-seat tables."""
+    return Testcase(
+        np.full(num_groups, 2),
+        np.array([2, 2, 2]),
+        np.array([[1, 1, 0], [1, 1, 1], [0, 1, 1]]),
+        np.full(num_groups, 3) if Pg is None else np.asarray(Pg),
+        np.full(num_groups, 20),
+        np.arange(num_groups),
+        np.full(num_groups, 2),
+        None,
+        0.5,
+        blocked=blocked or [[], [], []],
+        horizon=20,
+    )
+
+
+def test_feasible_plan_passes():
+    validator = Validator(_testcase())
+    assert validator.check(([0, 0, 3], [[0], [1], [0]])) == {}
+
+
+def test_nested_stints_all_overlap():
+    # A = [0, 10) holds B = [2, 3) and C = [5, 6); D = [10, 11) is clear
+    validator = Validator(_testcase(4, Pg=[10, 1, 1, 1]))
+    plan = ([0, 2, 5, 10], [[0], [0], [0], [0]])
+    assert validator.check(plan) == {"overlap": [0, 1, 2]}
+
+
+def test_blocked_and_connectivity():
+    validator = Validator(_testcase(2, blocked=[[(4, 6)], [], []]))
+    violations = validator.check(([3, 8], [[0], [0, 2]]))
+    assert violations == {"blocked": [0], "connectivity": [1]}
+
+
+def test_objective():
+    validator = Validator(_testcase())
+    # Waits 2 * (0 + 0), 2 * (1 + 0), 2 * (2 + 3); penalty (2 - 1) * 3
+    assert validator.objective(([0, 0, 3], [[0], [1], [0]])) == 12 - 0.5 * 3